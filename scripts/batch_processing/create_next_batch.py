@@ -12,20 +12,21 @@ from datetime import datetime
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
 from csv_handler import load_products_csv
 
+# Product fields copied into batch files (plus the enhancement flag)
+BATCH_COLUMNS = ['id', 'product_name', 'brand', 'category', 'subcategory',
+                 'size_value', 'size_unit', 'price', 'source', 'llm_fallback_used']
+
 def create_next_batch(batch_size=200, categories=None):
     """Create batch excluding enhanced products from all or specified categories"""
     
-    # Load products
-    df = load_products_csv()
-    
-    # Filter by categories if specified, otherwise use all
+    # Load only the fields a batch needs, filtered by categories if specified
     if categories:
         if isinstance(categories, str):
             categories = [categories]
-        products = df[df['category'].isin(categories)].copy()
+        products = load_products_csv(columns=BATCH_COLUMNS, filters={'category': categories})
         category_label = "_".join(categories)
     else:
-        products = df.copy()
+        products = load_products_csv(columns=BATCH_COLUMNS)
         category_label = "all_categories"
     
     # Filter out enhanced products (those with llm_fallback_used = True)
@@ -93,7 +94,7 @@ def create_next_batch(batch_size=200, categories=None):
 
 def get_category_stats():
     """Get statistics for all categories"""
-    df = load_products_csv()
+    df = load_products_csv(columns=['category', 'llm_fallback_used'])
     
     # Enhanced vs unenhanced by category
     stats = {}
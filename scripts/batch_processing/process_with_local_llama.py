@@ -4,28 +4,45 @@ Process batch with local Llama via Ollama
 """
 
 import pandas as pd
-import requests
 import json
 import sys
 import os
+import time
+import threading
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import re
 
 # Add parent directories to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
+from http_client import get_session
+from prompt_batching import format_products_block, nutrition_fields_template, batch_output_instructions, split_batch_response
+from ollama_client import stream_generate, has_fields, batch_has_fields, warm_up, DEFAULT_KEEP_ALIVE
 
 class LocalLlamaProcessor:
-    def __init__(self, model="llama3.2:3b"):
+    def __init__(self, model="llama3.2:3b", parallel_requests=None, max_retries=2, keep_alive=DEFAULT_KEEP_ALIVE):
         self.ollama_url = "http://localhost:11434/api/generate"
         self.model = model
+        self.keep_alive = keep_alive
+        self.model_load_seconds = None
         self.processed_count = 0
         self.failed_count = 0
         
+        # Requests kept in flight at once; match the server's OLLAMA_NUM_PARALLEL slots
+        self.parallel_requests = parallel_requests or int(os.getenv('OLLAMA_NUM_PARALLEL', 4))
+        self.max_retries = max_retries
+        self.item_latencies = []
+        self.early_stops = 0
+        self.model_reload_threshold = 0.5  # seconds; a model that is still loaded reports a few ms
+        self.model_reloads = []  # load seconds of each mid-run reload (keep_alive expired)
+        self._request_load_seconds = threading.local()  # current request's load, kept out of its latency
+        self._stats_lock = threading.Lock()
+        
     def check_ollama_status(self):
         """Check if Ollama is running and model is available"""
         try:
             # Check if Ollama is running
-            response = requests.get("http://localhost:11434/api/tags", timeout=5)
+            response = get_session().get("http://localhost:11434/api/tags", timeout=5)
             if response.status_code == 200:
                 models = response.json().get('models', [])
                 available_models = [model['name'] for model in models]
@@ -49,6 +66,39 @@ class LocalLlamaProcessor:
             print(f"💡 Make sure Ollama is running: ollama serve")
             return False
     
+    def warm_up_model(self):
+        """Preload the model (and keep it loaded) so the first products don't pay the load"""
+        print(f"🔥 Warming up {self.model} (keep_alive {self.keep_alive})...")
+        result = warm_up(self.ollama_url, self.model, self.keep_alive)
+        if result['loaded']:
+            self.model_load_seconds = result['load_seconds']
+            print(f"✅ Model ready: load {result['load_seconds']:.1f}s ({result['wall_seconds']:.1f}s wall)")
+        else:
+            print(f"⚠️ Warm-up failed ({result['error']}); the first request will load the model")
+        return result['loaded']
+    
+    def nutrition_guidance(self, category=None):
+        """Sources, fields and guidelines shared by the single and batch prompts (category None for a batch)"""
+        source_category = category if category is not None else "the product's category"
+        values_category = f"Indian {category} products" if category is not None else "each product's Indian category"
+        
+        return f"""DATA SOURCES (use in priority order):
+1. Official brand websites (Nestle India, Britannia, Parle, ITC, etc.)
+2. FSSAI nutrition databases
+3. Indian Food Composition Tables (NIN-ICMR)
+4. Verified Indian retailer nutrition labels
+5. Typical Indian market standards for {source_category}
+
+{nutrition_fields_template(for_each=category is None)}
+
+GUIDELINES:
+- Use Indian formulations (not international variants)
+- Consider Indian ingredients (mustard oil, jaggery, Indian spices)
+- Apply Indian serving size standards
+- Use realistic values for {values_category}
+- Use "null" for uncertain values
+- Confidence: 0.9+ (official), 0.8+ (govt DB), 0.7+ (retailer), 0.6+ (standard)"""
+    
     def create_nutrition_prompt(self, product_name, brand, category, subcategory, size_value, size_unit, price, source):
         """Create nutrition extraction prompt for local Llama"""
         
@@ -64,75 +114,64 @@ Source: {source}
 
 TASK: Extract nutrition data for this Indian food product. Focus on Indian market formulations and FSSAI standards.
 
-DATA SOURCES (use in priority order):
-1. Official brand websites (Nestle India, Britannia, Parle, ITC, etc.)
-2. FSSAI nutrition databases
-3. Indian Food Composition Tables (NIN-ICMR)
-4. Verified Indian retailer nutrition labels
-5. Typical Indian market standards for {category}
+{self.nutrition_guidance(category)}
 
-REQUIRED FIELDS - Provide as field-value pairs:
+Return ONLY the field-value pairs as shown above. No additional text or explanations."""
 
-NUTRITION (per 100g/100ml):
-energy_kcal_per_100g: <number>
-carbs_g_per_100g: <number>
-total_sugars_g_per_100g: <number>
-protein_g_per_100g: <number>
-fat_g_per_100g: <number>
-saturated_fat_g_per_100g: <number>
-fiber_g_per_100g: <number>
-sodium_mg_per_100g: <number>
-salt_g_per_100g: <number>
+        return prompt
+    
+    def create_batch_nutrition_prompt(self, rows):
+        """Create one nutrition extraction prompt covering several products"""
+        products_block = format_products_block(rows, [
+            ("Product", "product_name"), ("Brand", "brand"), ("Category", "category"),
+            ("Subcategory", "subcategory"), ("Size value", "size_value"), ("Size unit", "size_unit"),
+            ("Price (₹)", "price"), ("Source", "source")
+        ])
+        
+        prompt = f"""INDIAN FOOD NUTRITION DATA EXTRACTION - {len(rows)} PRODUCTS
 
-PRODUCT INFO:
-ingredients_list: ingredient1, ingredient2, ingredient3
-serving_size: 30g
-servings_per_container: 7
+{products_block}
 
-QUALITY:
-confidence_score: 0.85
-data_source: Brand official website
-processing_notes: Verified from Indian nutrition label
+TASK: Extract nutrition data for each Indian food product above. Focus on Indian market formulations and FSSAI standards.
 
-GUIDELINES:
-- Use Indian formulations (not international variants)
-- Consider Indian ingredients (mustard oil, jaggery, Indian spices)
-- Apply Indian serving size standards
-- Use realistic values for Indian {category} products
-- Use "null" for uncertain values
-- Confidence: 0.9+ (official), 0.8+ (govt DB), 0.7+ (retailer), 0.6+ (standard)
+{self.nutrition_guidance()}
 
-Return ONLY the field-value pairs as shown above. No additional text or explanations."""
+{batch_output_instructions(len(rows))}"""
 
         return prompt
     
-    def query_ollama(self, prompt):
-        """Query local Ollama with prompt"""
+    def query_ollama(self, prompt, num_predict=500, is_complete=has_fields):
+        """Query local Ollama with prompt, stopping the generation once is_complete(text)"""
         try:
             payload = {
                 "model": self.model,
                 "prompt": prompt,
-                "stream": False,
+                "keep_alive": self.keep_alive,
                 "options": {
                     "temperature": 0.3,
                     "top_p": 0.9,
-                    "num_predict": 500
+                    "num_predict": num_predict
                 }
             }
             
             print(f"  🤖 Querying {self.model}...")
-            response = requests.post(
+            text, stopped_early, load_seconds = stream_generate(
                 self.ollama_url,
-                json=payload,
-                timeout=60  # Increased timeout for local processing
+                payload,
+                is_complete=is_complete,
+                timeout=60 * max(1, num_predict // 500)  # 60s per 500 tokens for local processing
             )
             
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("response", "")
-            else:
-                print(f"  ❌ Ollama error: {response.status_code}")
-                return None
+            if stopped_early:
+                with self._stats_lock:
+                    self.early_stops += 1
+            if load_seconds:
+                self._request_load_seconds.value = getattr(self._request_load_seconds, 'value', 0.0) + load_seconds
+                if load_seconds >= self.model_reload_threshold:
+                    with self._stats_lock:
+                        self.model_reloads.append(load_seconds)
+                    print(f"  🔁 Model reloaded ({load_seconds:.1f}s, not counted as latency)")
+            return text
                 
         except Exception as e:
             print(f"  ❌ Ollama query failed: {e}")
@@ -203,8 +242,61 @@ Return ONLY the field-value pairs as shown above. No additional text or explanat
             print(f"  ❌ Parse error: {e}")
             return None
     
+    def parse_batch_response(self, response_text, count):
+        """Parse a multi-product response into per-product results by index"""
+        return [
+            self.parse_llama_response(section) if section else None
+            for section in split_batch_response(response_text, count)
+        ]
+    
+    def process_products(self, rows):
+        """Process several products with one Ollama request; failed items are retried one by one"""
+        if len(rows) == 1:
+            return [self.process_product(rows[0])]
+        
+        print(f"🔍 Processing {len(rows)} products in one request: "
+              f"{', '.join(str(row['product_name'])[:30] for row in rows)}")
+        
+        prompt = self.create_batch_nutrition_prompt(rows)
+        response = self.query_ollama(prompt, num_predict=500 * len(rows),
+                                     is_complete=lambda text: batch_has_fields(text, len(rows)))
+        results = self.parse_batch_response(response, len(rows)) if response else [None] * len(rows)
+        
+        for i, (row, nutrition_data) in enumerate(zip(rows, results)):
+            if nutrition_data:
+                self._count_result(True)
+            else:
+                print(f"  🔁 Item {i + 1} not parsed from batch, retrying individually")
+                results[i] = self.process_product(row)
+        
+        parsed = sum(1 for r in results if r)
+        print(f"  ✅ Batch done: {parsed}/{len(rows)} products with nutrition data")
+        return results
+    
+    def _count_result(self, success):
+        with self._stats_lock:
+            if success:
+                self.processed_count += 1
+            else:
+                self.failed_count += 1
+    
     def process_product(self, row):
-        """Process a single product"""
+        """Process a single product, retrying failures and timeouts up to max_retries times"""
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                print(f"  🔁 Retry {attempt}/{self.max_retries}: {str(row.get('product_name', 'unknown'))[:50]}")
+                time.sleep(2 ** (attempt - 1))
+            
+            nutrition_data = self._extract_nutrition(row)
+            if nutrition_data:
+                self._count_result(True)
+                return nutrition_data
+        
+        self._count_result(False)
+        return None
+    
+    def _extract_nutrition(self, row):
+        """One prompt/query/parse attempt for a single product"""
         try:
             product_name = row['product_name']
             brand = row['brand']
@@ -226,36 +318,102 @@ Return ONLY the field-value pairs as shown above. No additional text or explanat
             # Query Ollama
             response = self.query_ollama(prompt)
             if not response:
-                self.failed_count += 1
                 return None
             
             # Parse response
             nutrition_data = self.parse_llama_response(response)
             if nutrition_data:
-                self.processed_count += 1
                 print(f"  ✅ Success! Confidence: {nutrition_data.get('confidence_score', 'N/A')}")
                 return nutrition_data
             else:
-                self.failed_count += 1
                 print(f"  ❌ Failed to extract valid data")
                 return None
                 
         except Exception as e:
             print(f"  ❌ Error processing {row.get('product_name', 'unknown')}: {e}")
-            self.failed_count += 1
             return None
     
-    def process_batch(self, input_file, max_products=None):
-        """Process batch file with local Llama"""
+    def _timed_process_products(self, rows):
+        """process_products, recording each item's latency (its request's wall time less any model load)"""
+        self._request_load_seconds.value = 0.0
+        start = time.time()
+        results = self.process_products(rows)
+        latency = max(time.time() - start - self._request_load_seconds.value, 0.0)
+        with self._stats_lock:
+            self.item_latencies.extend([latency] * len(rows))
+        return results
+    
+    def journal_path(self, input_file):
+        """Checkpoint journal for an input batch (one JSON line per finished product)"""
+        stem = os.path.splitext(os.path.basename(input_file))[0]
+        return f"llm_batches/output/{stem}.journal.jsonl"
+    
+    def _row_key(self, row):
+        """Identity used to match journal entries to input rows"""
+        key = row.get('original_product_id')
+        if key is None or (isinstance(key, float) and pd.isna(key)):
+            key = row.get('product_name')
+        return str(key)
+    
+    def load_journal(self, journal_file):
+        """
+        Successfully enhanced rows already journaled, by row key
+        
+        Failed products are left out so a resumed run retries them; a torn
+        last line is ignored
+        """
+        done = {}
+        if not os.path.exists(journal_file):
+            return done
+        
+        with open(journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # partial write from a crash
+                if entry.get('success'):
+                    done[entry['key']] = entry['row']
+        return done
+    
+    def _append_journal(self, journal, row, enhanced_row, success):
+        """Durably append one finished product to the journal"""
+        line = json.dumps({'key': self._row_key(row), 'success': success, 'row': enhanced_row},
+                          ensure_ascii=False, default=str)
+        with self._stats_lock:
+            journal.write(line + '\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+    
+    def process_batch(self, input_file, max_products=None, products_per_prompt=1, resume=False, restart=False):
+        """
+        Process batch file with local Llama
+        
+        parallel_requests requests run at once (each with products_per_prompt
+        products); results are assembled in input order. Each finished
+        product is appended to a journal as it completes, and resume=True
+        skips products already enhanced in the journal from an earlier run
+        (failed ones are retried). An existing journal is only overwritten
+        with restart=True.
+        """
         
         if not os.path.exists(input_file):
             print(f"❌ Input file not found: {input_file}")
             return False
         
+        journal_file = self.journal_path(input_file)
+        if not resume and not restart and os.path.exists(journal_file) and os.path.getsize(journal_file) > 0:
+            print(f"❌ Journal from an earlier run exists: {journal_file}")
+            print(f"💡 Use --resume to continue it, or --restart to discard it and start over")
+            return False
+        
         # Check Ollama status
         if not self.check_ollama_status():
             return False
         
+        # Load the model before timing starts, so throughput and latency exclude it
+        self.warm_up_model()
+        
         # Load batch
         df = pd.read_csv(input_file)
         print(f"\n📥 Loaded {len(df)} products from batch")
@@ -271,21 +429,46 @@ Return ONLY the field-value pairs as shown above. No additional text or explanat
             for cat, count in category_counts.items():
                 print(f"   {cat}: {count} products")
         
-        # Process each product
-        enhanced_products = []
-        for idx, row in df.iterrows():
-            print(f"\n[{idx+1}/{len(df)}]", end=" ")
-            
-            # Create enhanced row with original data
-            enhanced_row = row.to_dict()
+        # Products finished by an earlier run come from the journal
+        rows = [row for _, row in df.iterrows()]
+        journaled = self.load_journal(journal_file) if resume else {}
+        enhanced_products = [journaled.get(self._row_key(row)) for row in rows]
+        todo = [i for i, enhanced_row in enumerate(enhanced_products) if enhanced_row is None]
+        
+        if resume:
+            print(f"\n♻️ Resuming: {len(rows) - len(todo)} products already enhanced in {journal_file}, "
+                  f"{len(todo)} to go (including earlier failures)")
+        
+        # Process products (one or several per request, several requests in flight)
+        completed = len(rows) - len(todo)
+        start_time = time.time()
+        print(f"\n⚡ {self.parallel_requests} parallel requests, {products_per_prompt} product(s) per request")
+        
+        os.makedirs(os.path.dirname(journal_file), exist_ok=True)
+        with open(journal_file, 'a' if resume else 'w', encoding='utf-8') as journal, \
+             ThreadPoolExecutor(max_workers=self.parallel_requests) as executor:
+            def process_group(group):
+                # Journal from the worker as soon as the request finishes, so a crash
+                # only loses the requests still in flight
+                for i, nutrition_data in zip(group, self._timed_process_products([rows[i] for i in group])):
+                    # Create enhanced row with original data
+                    enhanced_row = rows[i].to_dict()
+                    if nutrition_data:
+                        # Add nutrition fields to row
+                        enhanced_row.update(nutrition_data)
+                    
+                    enhanced_products[i] = enhanced_row
+                    self._append_journal(journal, rows[i], enhanced_row, bool(nutrition_data))
             
-            # Get nutrition data
-            nutrition_data = self.process_product(row)
-            if nutrition_data:
-                # Add nutrition fields to row
-                enhanced_row.update(nutrition_data)
+            groups = [todo[start:start + products_per_prompt] for start in range(0, len(todo), products_per_prompt)]
+            futures = {executor.submit(process_group, group): group for group in groups}
             
-            enhanced_products.append(enhanced_row)
+            for future in as_completed(futures):
+                future.result()
+                completed += len(futures[future])
+                print(f"\n[{completed}/{len(df)}] done")
+        
+        elapsed = time.time() - start_time
         
         # Save results
         timestamp = datetime.now().strftime('%Y%m%d_%H%M')
@@ -298,7 +481,23 @@ Return ONLY the field-value pairs as shown above. No additional text or explanat
         print(f"📤 Results saved to: {output_file}")
         print(f"✅ Processed: {self.processed_count}")
         print(f"❌ Failed: {self.failed_count}")
-        print(f"📊 Success rate: {(self.processed_count/(self.processed_count+self.failed_count)*100):.1f}%")
+        if self.processed_count + self.failed_count > 0:
+            print(f"📊 Success rate: {(self.processed_count/(self.processed_count+self.failed_count)*100):.1f}%")
+        
+        if self.model_load_seconds is not None:
+            print(f"🔥 Model load: {self.model_load_seconds:.1f}s (warm-up, not included below)")
+        if self.model_reloads:
+            print(f"🔁 Model reloaded mid-run {len(self.model_reloads)} time(s): "
+                  f"{sum(self.model_reloads):.1f}s (not included in latency below)")
+        if self.item_latencies:
+            latencies = sorted(self.item_latencies)
+            print(f"⏱️ Per-item latency: p50 {latencies[len(latencies) // 2]:.1f}s, "
+                  f"p95 {latencies[max(int(len(latencies) * 0.95) - 1, 0)]:.1f}s, max {latencies[-1]:.1f}s")
+        if todo:
+            print(f"🚀 Throughput: {len(todo) / elapsed * 60 if elapsed > 0 else 0:.1f} products/min "
+                  f"({elapsed:.0f}s total)")
+        print(f"⏹️ Generations stopped early once all fields were parsed: {self.early_stops}")
+        print(f"📓 Journal: {journal_file} (rerun with --resume to continue an interrupted run)")
         
         return output_file
 
@@ -313,11 +512,33 @@ def main():
     - Products with good nutrition data but N/A confidence are VALID
     - Success rate typically 97-100% with occasional timeout failures
     - Output goes to llm_batches/output/llama_enhanced_[N]products_[TIMESTAMP].csv
+    - Finished products are journaled as they complete; --resume continues a crashed run
+      and retries its failures, --restart discards the journal
     """
-    processor = LocalLlamaProcessor()
+    import argparse
     
+    parser = argparse.ArgumentParser(description='Process a batch with local Llama via Ollama')
     # IMPORTANT: Update this filename to match the latest batch from create_next_batch.py
-    input_file = "llm_batches/input/input_all_categories_50products_20251105_1326.csv"
+    parser.add_argument('input_file', nargs='?',
+                       default="llm_batches/input/input_all_categories_50products_20251105_1326.csv",
+                       help='Batch CSV from create_next_batch.py')
+    parser.add_argument('--max-products', type=int, default=50,
+                       help='Process at most this many products (default: 50)')
+    parser.add_argument('--resume', action='store_true',
+                       help='Skip products already enhanced in the journal from an interrupted run')
+    parser.add_argument('--restart', action='store_true',
+                       help='Discard an existing journal and process every product again')
+    parser.add_argument('--parallel', type=int, default=None,
+                       help='Requests in flight (default: OLLAMA_NUM_PARALLEL or 4)')
+    parser.add_argument('--products-per-prompt', type=int, default=1,
+                       help='Products packed into each request (default: 1)')
+    parser.add_argument('--keep-alive', default=DEFAULT_KEEP_ALIVE,
+                       help=f'How long Ollama keeps the model loaded (default: {DEFAULT_KEEP_ALIVE})')
+    
+    args = parser.parse_args()
+    input_file = args.input_file
+    
+    processor = LocalLlamaProcessor(parallel_requests=args.parallel, keep_alive=args.keep_alive)
     
     if not os.path.exists(input_file):
         print(f"❌ Input file not found: {input_file}")
@@ -326,9 +547,11 @@ def main():
     
     print(f"🚀 Starting Local Llama Processing")
     print(f"📥 Input: {input_file}")
-    print(f"🤖 Model: llama3.2:3b")
+    print(f"🤖 Model: {processor.model}")
     
-    processor.process_batch(input_file, max_products=50)
+    processor.process_batch(input_file, max_products=args.max_products,
+                            products_per_prompt=args.products_per_prompt, resume=args.resume,
+                            restart=args.restart)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Catalog Backup - Deduplicated snapshots of data/products.csv
+Files are split into line-aligned, content-defined chunks that are stored
+once by SHA-256 (gzip compressed); a snapshot is a small manifest listing
+its chunks, so unchanged parts of the catalog are shared across snapshots
+"""
+
+import os
+import sys
+import gzip
+import json
+import zlib
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+sys.path.append(os.path.dirname(__file__))
+from csv_handler import atomic_write, delta_path
+
+DEFAULT_STORE_DIR = 'data/backups/store'
+
+# Chunk boundaries fall after lines whose CRC matches the mask, so an edited
+# row only changes its own chunk (~256 KB on average, 64 KB - 1 MB)
+CHUNK_MASK = (1 << 8) - 1
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+
+
+class CatalogBackup:
+    """Content-addressed snapshot store for the products catalog"""
+
+    def __init__(self, store_dir: str = DEFAULT_STORE_DIR):
+        self.store_dir = store_dir
+        self.objects_dir = os.path.join(store_dir, 'objects')
+        self.snapshots_dir = os.path.join(store_dir, 'snapshots')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.gz")
+
+    def _store_chunk(self, data: bytes) -> tuple:
+        """Store a chunk unless it already exists; returns (digest, bytes written)"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = gzip.compress(data, compresslevel=6)
+        with atomic_write(path, binary=True) as f:
+            f.write(compressed)
+        return digest, len(compressed)
+
+    def _backup_file(self, file_path: str, stats: Dict) -> Dict:
+        """Chunk and store one file; returns its manifest entry"""
+        digest = hashlib.sha256()
+        chunks = []
+        size = 0
+
+        for chunk in iter_chunks(file_path):
+            digest.update(chunk)
+            size += len(chunk)
+            chunk_digest, written = self._store_chunk(chunk)
+            chunks.append(chunk_digest)
+            stats['chunks'] += 1
+            stats['new_chunks'] += 1 if written else 0
+            stats['bytes_written'] += written
+
+        return {'size': size, 'sha256': digest.hexdigest(), 'chunks': chunks}
+
+    def create_snapshot(self, file_path: str = 'data/products.csv', label: str = None) -> str:
+        """
+        Snapshot a products CSV (and its delta log, if any)
+
+        Args:
+            file_path: Catalog file to back up
+            label: Short description stored with the snapshot
+
+        Returns:
+            Snapshot id
+        """
+        created = datetime.now(timezone.utc)
+        stats = {'chunks': 0, 'new_chunks': 0, 'bytes_written': 0}
+
+        files = {os.path.basename(file_path): self._backup_file(file_path, stats)}
+        if os.path.exists(delta_path(file_path)):
+            files[os.path.basename(delta_path(file_path))] = self._backup_file(delta_path(file_path), stats)
+
+        main_digest = files[os.path.basename(file_path)]['sha256']
+        snapshot_id = f"{created.strftime('%Y%m%d_%H%M%S')}_{main_digest[:8]}"
+        manifest = {
+            'id': snapshot_id,
+            'label': label or '',
+            'source': os.path.abspath(file_path),
+            'created': created.isoformat(),
+            'files': files,
+            'stats': stats
+        }
+
+        with atomic_write(os.path.join(self.snapshots_dir, f"{snapshot_id}.json")) as f:
+            json.dump(manifest, f, indent=2)
+
+        return snapshot_id
+
+    def list_snapshots(self) -> List[Dict]:
+        """Snapshot manifests, oldest first"""
+        manifests = []
+        for name in sorted(os.listdir(self.snapshots_dir)):
+            if name.endswith('.json'):
+                with open(os.path.join(self.snapshots_dir, name), 'r', encoding='utf-8') as f:
+                    manifests.append(json.load(f))
+        return manifests
+
+    def get_snapshot(self, snapshot_id: str) -> Dict:
+        """Manifest of one snapshot"""
+        path = os.path.join(self.snapshots_dir, f"{snapshot_id}.json")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Snapshot not found: {snapshot_id}")
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def restore_snapshot(self, snapshot_id: str, file_path: Optional[str] = None) -> str:
+        """
+        Restore a snapshot over the catalog (atomically, verifying checksums)
+
+        Args:
+            snapshot_id: Snapshot to restore
+            file_path: Where to restore the CSV (default: its original path)
+
+        Returns:
+            Path of the restored CSV
+        """
+        manifest = self.get_snapshot(snapshot_id)
+        file_path = file_path or manifest['source']
+        directory = os.path.dirname(os.path.abspath(file_path))
+        targets = {
+            os.path.basename(manifest['source']): file_path,
+            os.path.basename(delta_path(manifest['source'])): delta_path(file_path),
+        }
+
+        for name, target in targets.items():
+            entry = manifest['files'].get(name)
+            if entry is None:
+                # Snapshot had no delta log - none should remain after restore
+                if os.path.exists(target):
+                    os.remove(target)
+                continue
+
+            digest = hashlib.sha256()
+            with atomic_write(os.path.join(directory, os.path.basename(target)), binary=True) as f:
+                for chunk_digest in entry['chunks']:
+                    with open(self._object_path(chunk_digest), 'rb') as chunk_file:
+                        data = gzip.decompress(chunk_file.read())
+                    digest.update(data)
+                    f.write(data)
+
+                if digest.hexdigest() != entry['sha256']:
+                    raise ValueError(f"Checksum mismatch restoring {name} from {snapshot_id}")
+
+        return file_path
+
+    def delete_snapshot(self, snapshot_id: str) -> None:
+        """Delete a snapshot manifest (chunks are freed by collect_garbage)"""
+        os.remove(os.path.join(self.snapshots_dir, f"{snapshot_id}.json"))
+
+    def prune(self, keep: int = 10) -> Dict:
+        """Keep the newest `keep` snapshots and delete unreferenced chunks"""
+        snapshots = self.list_snapshots()
+        removed = snapshots[:-keep] if keep > 0 else snapshots
+        for manifest in removed:
+            self.delete_snapshot(manifest['id'])
+        freed = self.collect_garbage()
+        return {'snapshots_removed': len(removed), 'chunks_removed': freed}
+
+    def collect_garbage(self) -> int:
+        """Delete chunks no snapshot references; returns the number removed"""
+        referenced = set()
+        for manifest in self.list_snapshots():
+            for entry in manifest['files'].values():
+                referenced.update(entry['chunks'])
+
+        removed = 0
+        for root, _, names in os.walk(self.objects_dir):
+            for name in names:
+                if name.endswith('.gz') and name[:-3] not in referenced:
+                    os.remove(os.path.join(root, name))
+                    removed += 1
+        return removed
+
+    def store_size(self) -> int:
+        """Bytes used by stored chunks"""
+        total = 0
+        for root, _, names in os.walk(self.objects_dir):
+            total += sum(os.path.getsize(os.path.join(root, name)) for name in names)
+        return total
+
+
+def iter_chunks(file_path: str) -> Iterator[bytes]:
+    """Split a file into line-aligned, content-defined chunks"""
+    buffer = []
+    size = 0
+
+    with open(file_path, 'rb') as f:
+        for line in f:
+            buffer.append(line)
+            size += len(line)
+
+            at_boundary = size >= MIN_CHUNK_SIZE and (zlib.crc32(line) & CHUNK_MASK) == 0
+            if at_boundary or size >= MAX_CHUNK_SIZE:
+                yield b''.join(buffer)
+                buffer = []
+                size = 0
+
+    if buffer:
+        yield b''.join(buffer)
+
+def create_backup(file_path: str = 'data/products.csv', label: str = None,
+                  store_dir: str = DEFAULT_STORE_DIR) -> str:
+    """Snapshot the catalog into the default store; returns the snapshot id"""
+    return CatalogBackup(store_dir).create_snapshot(file_path, label)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Deduplicated products.csv backups')
+    parser.add_argument('command', choices=['create', 'list', 'restore', 'prune'])
+    parser.add_argument('snapshot_id', nargs='?', help='Snapshot to restore')
+    parser.add_argument('--file', default='data/products.csv',
+                       help='Products CSV path (default: data/products.csv)')
+    parser.add_argument('--store', default=DEFAULT_STORE_DIR,
+                       help=f'Backup store directory (default: {DEFAULT_STORE_DIR})')
+    parser.add_argument('--label', default='manual', help='Label for create (default: manual)')
+    parser.add_argument('--keep', type=int, default=10, help='Snapshots kept by prune (default: 10)')
+
+    args = parser.parse_args()
+    backup = CatalogBackup(args.store)
+
+    if args.command == 'create':
+        snapshot_id = backup.create_snapshot(args.file, args.label)
+        stats = backup.get_snapshot(snapshot_id)['stats']
+        print(f"✅ Snapshot created: {snapshot_id}")
+        print(f"   New chunks: {stats['new_chunks']}/{stats['chunks']} ({stats['bytes_written']:,} bytes written)")
+    elif args.command == 'list':
+        for manifest in backup.list_snapshots():
+            size = sum(entry['size'] for entry in manifest['files'].values())
+            print(f"{manifest['id']}  {manifest['created'][:19]}  {size:>14,} bytes  {manifest['label']}")
+        print(f"📦 Store size: {backup.store_size():,} bytes")
+    elif args.command == 'restore':
+        if not args.snapshot_id:
+            parser.error('restore needs a snapshot_id')
+        restored = backup.restore_snapshot(args.snapshot_id, args.file)
+        print(f"✅ Restored {args.snapshot_id} to {restored}")
+    else:
+        result = backup.prune(args.keep)
+        print(f"🧹 Removed {result['snapshots_removed']} snapshots and {result['chunks_removed']} chunks")
@@ -4,93 +4,756 @@ Robust CSV Handler for Products Data
 Handles the complex CSV format with || separators and embedded JSON/URLs
 """
 
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
 import pandas as pd
 import csv
 
-def load_products_csv(file_path='data/products.csv'):
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    # Optional: without pyarrow the columnar sidecar cache is simply skipped
+    pa = None
+    feather = None
+
+NUMERIC_COLUMNS = ['size_value', 'price', 'search_count', 'data_quality_score']
+
+# Low-cardinality text columns stored as categoricals in compact mode
+CATEGORICAL_COLUMNS = ['category', 'subcategory', 'source', 'size_unit', 'brand']
+
+# Bump when the parsing rules change so old sidecars are regenerated
+SIDECAR_VERSION = '1'
+
+# In-process cache of loaded frames: (path, columns, filters) -> (size, mtime_ns, frame)
+FRAME_CACHE_SIZE = 8
+_frame_cache = OrderedDict()
+_frame_cache_stats = {'hits': 0, 'misses': 0}
+_frame_cache_lock = threading.Lock()
+
+def _split_line(line, n_fields, maxsplit=-1):
     """
-    Safely load the products CSV file with proper handling of complex data
+    Split one data line into exactly n_fields values
     
+    With maxsplit, only the leading maxsplit + 1 fields are split out;
+    the rest of the line stays in the last value and is not parsed.
+    """
+    fields = line.strip().split('||', maxsplit)
+    
+    # Handle field count mismatches
+    if len(fields) < n_fields:
+        # Pad with empty strings
+        fields.extend([''] * (n_fields - len(fields)))
+    elif len(fields) > n_fields:
+        # Truncate extra fields (usually from URLs with || in them)
+        fields = fields[:n_fields]
+    
+    return fields
+
+def _apply_dtypes(df):
+    """Convert the numeric and boolean columns of a freshly parsed frame"""
+    # Convert data types
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    
+    # Handle boolean columns
+    if 'llm_fallback_used' in df.columns:
+        df['llm_fallback_used'] = df['llm_fallback_used'].map({
+            'True': True, 'False': False, True: True, False: False
+        }).fillna(False).astype(bool)
+    
+    return df
+
+def compact_products_frame(df, report=False):
+    """
+    Convert a products frame to memory-compact dtypes
+    
+    - low-cardinality text columns (CATEGORICAL_COLUMNS) -> category
+    - nutrition *_per_100g columns -> nullable Float32
+    - llm_fallback_used -> bool
+    
+    Categorical columns only accept existing values, so add categories
+    (or convert back with astype(str)) before writing new ones.
+    
+    Args:
+        df (pandas.DataFrame): Products data, converted in place
+        report (bool): Print memory usage before and after
+        
     Returns:
-        pandas.DataFrame: The loaded products data
+        pandas.DataFrame: The same frame with compact dtypes
     """
     
-    try:
-        # Manual parsing method (most reliable)
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+    before = df.memory_usage(deep=True).sum() if report else 0
+    
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            # Only worth it when values repeat
+            if df[col].nunique(dropna=True) <= len(df) // 2:
+                df[col] = df[col].astype('category')
+    
+    for col in df.columns:
+        if str(col).endswith('_per_100g'):
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Float32')
+    
+    if 'llm_fallback_used' in df.columns:
+        df['llm_fallback_used'] = df['llm_fallback_used'].fillna(False).astype(bool)
+    
+    if report:
+        after = df.memory_usage(deep=True).sum()
+        saved = (1 - after / before) * 100 if before else 0
+        print(f"🗜️ Memory: {before / 1024 / 1024:.1f} MB → {after / 1024 / 1024:.1f} MB ({saved:.0f}% smaller)")
+    
+    return df
+
+def _filter_values(value):
+    """Normalize a filter value to a list of accepted values"""
+    if isinstance(value, (list, tuple, set, frozenset, pd.Series, pd.Index)):
+        return list(value)
+    return [value]
+
+def _filter_mask(df, filters):
+    """Boolean mask of the rows of a typed frame matching all filters"""
+    mask = pd.Series(True, index=df.index)
+    for col, value in filters.items():
+        mask &= df[col].isin(_filter_values(value))
+    return mask
+
+def _raw_filters(filters):
+    """
+    Turn filters on text and boolean columns into checks on raw CSV strings
+    
+    Numeric columns are left out; they are filtered after type conversion.
+    """
+    raw = {}
+    for col, value in filters.items():
+        if col in NUMERIC_COLUMNS:
+            continue
+        if col == 'llm_fallback_used':
+            # Anything other than 'True' loads as False
+            wanted = {bool(v) for v in _filter_values(value)}
+            raw[col] = lambda text, wanted=wanted: (text == 'True') in wanted
+        else:
+            wanted = {str(v) for v in _filter_values(value)}
+            raw[col] = lambda text, wanted=wanted: text in wanted
+    return raw
+
+def iter_products_csv(file_path='data/products.csv', chunksize=50000, columns=None, filters=None):
+    """
+    Stream the products CSV file as typed DataFrame chunks
+    
+    Lines are read lazily, so only one chunk of rows is held in memory at a
+    time. Each chunk gets the same padding/truncation and type conversion as
+    load_products_csv, and pending updates from the delta log are merged
+    into its rows before filtering.
+    
+    Args:
+        file_path (str): Path to the CSV file
+        chunksize (int): Maximum number of rows per chunk (before filtering)
+        columns (list): Only return these columns (default: all)
+        filters (dict): Column -> value or list of values; only rows
+            matching every filter are returned, e.g.
+            {'category': ['beverage', 'snacks'], 'llm_fallback_used': False}
         
+    Yields:
+        pandas.DataFrame: Consecutive chunks of the products data
+    """
+    
+    if chunksize < 1:
+        raise ValueError("chunksize must be a positive integer")
+    
+    filters = filters or {}
+    
+    with open(file_path, 'r', encoding='utf-8') as f:
         # Parse header
-        header = lines[0].strip().split('||')
+        header = f.readline().strip().split('||')
         
-        # Parse data lines
-        data_rows = []
+        wanted = header if columns is None else list(columns)
+        for col in list(wanted) + list(filters):
+            if col not in header:
+                raise KeyError(f"Column not found in {file_path}: {col}")
+        
+        # Only deltas for returned or filtered columns matter; their rows need the id
+        needed = set(wanted) | set(filters)
+        deltas = {field: values for field, values in read_deltas(file_path).items() if field in needed}
+        delta_ids = set().union(*deltas.values()) if deltas else set()
+        if deltas:
+            needed.add('id')
+        
+        # Only split as far as the last column we need
+        positions = [header.index(col) for col in header if col in needed]
+        maxsplit = -1 if columns is None else positions[-1] + 1 if positions else 0
         
-        for line in lines[1:]:
-            fields = line.strip().split('||')
+        parsed = [header[i] for i in positions]
+        raw_checks = [(header.index(col), check) for col, check in _raw_filters(filters).items()]
+        typed_filters = {col: v for col, v in filters.items() if col in NUMERIC_COLUMNS}
+        id_position = header.index('id') if deltas else None
+        
+        def build_chunk(rows):
+            chunk = _apply_dtypes(pd.DataFrame(rows, columns=parsed))
+            if deltas:
+                chunk = _merge_deltas(chunk, deltas)
+                # Rows with deltas skipped the raw checks, so filter them on merged values
+                if filters:
+                    chunk = chunk[_filter_mask(chunk, filters)].reset_index(drop=True)
+            elif typed_filters:
+                chunk = chunk[_filter_mask(chunk, typed_filters)].reset_index(drop=True)
+            return chunk[wanted] if list(chunk.columns) != wanted else chunk
+        
+        data_rows = []
+        for line in f:
+            fields = _split_line(line, len(header), maxsplit)
             
-            # Handle field count mismatches
-            if len(fields) < len(header):
-                # Pad with empty strings
-                fields.extend([''] * (len(header) - len(fields)))
-            elif len(fields) > len(header):
-                # Truncate extra fields (usually from URLs with || in them)
-                fields = fields[:len(header)]
+            if (raw_checks and not all(check(fields[i]) for i, check in raw_checks)
+                    and not (delta_ids and fields[id_position] in delta_ids)):
+                continue
             
-            data_rows.append(fields)
+            data_rows.append([fields[i] for i in positions] if columns is not None else fields)
+            
+            if len(data_rows) >= chunksize:
+                yield build_chunk(data_rows)
+                data_rows = []
         
-        # Create DataFrame
-        df = pd.DataFrame(data_rows, columns=header)
+        if data_rows:
+            yield build_chunk(data_rows)
+
+def load_products_csv(file_path='data/products.csv', columns=None, filters=None, use_cache=True,
+                      compact=False):
+    """
+    Safely load the products CSV file with proper handling of complex data
+    
+    Loaded frames are cached in-process per path/columns/filters and reused
+    while the file's size and mtime are unchanged; each call gets its own
+    copy. When pyarrow is installed, the parsed and typed frame is also kept
+    in a columnar sidecar file next to the CSV (see sidecar_path). Without a
+    fresh sidecar, columns and filters are applied while reading, so unneeded
+    fields and rows are never parsed.
+    
+    Pending row updates from the delta log (see append_deltas) are merged
+    over the base file before filters and columns are applied.
+    
+    Args:
+        file_path (str): Path to the CSV file
+        columns (list): Only return these columns (default: all)
+        filters (dict): Column -> value or list of values to keep, e.g.
+            {'category': ['beverage'], 'llm_fallback_used': True}
+        use_cache (bool): Use the in-process frame cache and the columnar
+            sidecar cache
+        compact (bool): Use memory-compact dtypes (see compact_products_frame)
+    
+    Returns:
+        pandas.DataFrame: The loaded products data
+    """
+    
+    if not _delta_files(file_path):
+        df = _load_base(file_path, columns, filters, use_cache)
+        return compact_products_frame(df) if compact else df
+    
+    # Deltas can change filtered fields, so filter after merging them
+    base_columns = None
+    if columns is not None:
+        header = _read_header(file_path)
+        needed = ['id'] + list(columns) + list(filters or {})
+        base_columns = [col for col in dict.fromkeys(needed) if col in header]
+    
+    if use_cache:
+        df = _cached_merged_frame(file_path, base_columns)
+    else:
+        df = _merge_deltas(_load_base(file_path, base_columns, None, False), read_deltas(file_path))
+    
+    if filters:
+        df = df[_filter_mask(df, filters)].reset_index(drop=True)
+    if columns is not None:
+        df = df[list(columns)].copy()
+    
+    return compact_products_frame(df) if compact else df
+
+def _load_base(file_path, columns, filters, use_cache):
+    """Load the base CSV (without deltas), through the caches if enabled"""
+    if use_cache:
+        return _cached_frame(file_path, columns, filters)
+    return _load_products(file_path, columns, filters, use_cache)
+
+def _read_header(file_path):
+    """Column names of a products CSV"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.readline().strip().split('||')
+
+def _frame_cache_key(file_path, columns, filters):
+    """Hashable key for one load request"""
+    columns_key = tuple(columns) if columns is not None else None
+    filters_key = tuple(sorted((col, repr(_filter_values(v))) for col, v in (filters or {}).items()))
+    return (os.path.abspath(file_path), columns_key, filters_key)
+
+def _copy_on_write_enabled():
+    """Whether pandas copy-on-write protects shallow copies from in-place edits"""
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    return getattr(pd.options.mode, 'copy_on_write', False) is True
+
+def _file_version(path):
+    """Size and mtime identifying one version of a file"""
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+def _cached_frame(file_path, columns, filters):
+    """Serve a load from the in-process cache, loading it on a miss"""
+    try:
+        version = _file_version(file_path)
+    except OSError as e:
+        raise Exception(f"Failed to load CSV: {e}")
+    
+    return _through_frame_cache(_frame_cache_key(file_path, columns, filters), version,
+                                lambda: _load_products(file_path, columns, filters, True))
+
+def _cached_merged_frame(file_path, columns):
+    """Base frame with the delta log merged in, cached until the base or a log changes"""
+    try:
+        version = (_file_version(file_path),) + tuple(
+            (path, _file_version(path)) for path in _delta_files(file_path)
+        )
+    except OSError as e:
+        raise Exception(f"Failed to load CSV: {e}")
+    
+    key = _frame_cache_key(file_path, columns, None) + ('deltas',)
+    return _through_frame_cache(key, version, lambda: _merge_deltas(
+        _load_base(file_path, columns, None, True), read_deltas(file_path)
+    ))
+
+def _through_frame_cache(key, version, load):
+    """Cached frame for key if its version matches, else load() it and cache that"""
+    with _frame_cache_lock:
+        entry = _frame_cache.get(key)
+        if entry is not None and entry[0] == version:
+            _frame_cache.move_to_end(key)
+            _frame_cache_stats['hits'] += 1
+            df = entry[1]
+        else:
+            _frame_cache_stats['misses'] += 1
+            df = None
+    
+    if df is None:
+        df = load()
+        with _frame_cache_lock:
+            _frame_cache[key] = (version, df)
+            _frame_cache.move_to_end(key)
+            while len(_frame_cache) > FRAME_CACHE_SIZE:
+                _frame_cache.popitem(last=False)
+    
+    # Callers edit their frames, so never hand out the cached one itself
+    return df.copy(deep=not _copy_on_write_enabled())
+
+def get_frame_cache_stats():
+    """Hit/miss counters and size of the in-process frame cache"""
+    with _frame_cache_lock:
+        return dict(_frame_cache_stats, entries=len(_frame_cache))
+
+def clear_frame_cache(file_path=None):
+    """Drop cached frames (all, or only those loaded from file_path)"""
+    with _frame_cache_lock:
+        if file_path is None:
+            _frame_cache.clear()
+            return
+        path = os.path.abspath(file_path)
+        for key in [k for k in _frame_cache if k[0] == path]:
+            del _frame_cache[key]
+
+def _load_products(file_path, columns, filters, use_cache):
+    """Load products from the sidecar cache or the CSV text"""
+    try:
+        cache_enabled = use_cache and feather is not None
         
-        # Convert data types
-        if 'size_value' in df.columns:
-            df['size_value'] = pd.to_numeric(df['size_value'], errors='coerce')
-        if 'price' in df.columns:
-            df['price'] = pd.to_numeric(df['price'], errors='coerce')
-        if 'search_count' in df.columns:
-            df['search_count'] = pd.to_numeric(df['search_count'], errors='coerce')
-        if 'data_quality_score' in df.columns:
-            df['data_quality_score'] = pd.to_numeric(df['data_quality_score'], errors='coerce')
+        if cache_enabled:
+            df = _read_sidecar(file_path, columns, filters)
+            if df is not None:
+                return df
         
-        # Handle boolean columns
-        if 'llm_fallback_used' in df.columns:
-            df['llm_fallback_used'] = df['llm_fallback_used'].map({
-                'True': True, 'False': False, True: True, False: False
-            }).fillna(False)
+        if cache_enabled:
+            # Fingerprint before parsing so a concurrent rewrite shows up as stale
+            fingerprint = _csv_fingerprint(file_path)
+            fingerprint['sha256'] = _file_sha256(file_path)
+            
+            df = _parse_products_csv(file_path)
+            _write_sidecar(df, file_path, fingerprint)
+            
+            if filters:
+                df = df[_filter_mask(df, filters)].reset_index(drop=True)
+            if columns is not None:
+                df = df[list(columns)].copy()
+            return df
         
-        return df
+        return _parse_products_csv(file_path, columns, filters)
         
     except Exception as e:
         raise Exception(f"Failed to load CSV: {e}")
 
-def save_products_csv(df, file_path='data/products.csv'):
+def _parse_products_csv(file_path, columns=None, filters=None):
+    """Parse the CSV text file into one typed DataFrame"""
+    chunks = list(iter_products_csv(file_path, columns=columns, filters=filters))
+    
+    if not chunks:
+        # No matching rows - keep the columns
+        with open(file_path, 'r', encoding='utf-8') as f:
+            header = f.readline().strip().split('||')
+        df = _apply_dtypes(pd.DataFrame([], columns=header))
+        return df[list(columns)] if columns is not None else df
+    
+    if len(chunks) == 1:
+        return chunks[0]
+    
+    return pd.concat(chunks, ignore_index=True)
+
+def sidecar_path(file_path):
+    """Path of the columnar cache file kept next to a products CSV"""
+    directory, name = os.path.split(os.path.abspath(file_path))
+    return os.path.join(directory, f".{name}.feather")
+
+def _file_sha256(file_path):
+    """SHA-256 of a file, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _csv_fingerprint(file_path):
+    """Size and modification time identifying one version of the CSV"""
+    stat = os.stat(file_path)
+    return {'size': str(stat.st_size), 'mtime_ns': str(stat.st_mtime_ns)}
+
+def _sidecar_is_fresh(file_path, metadata):
+    """Check sidecar metadata against the current CSV"""
+    if metadata.get('sidecar_version') != SIDECAR_VERSION:
+        return False
+    
+    current = _csv_fingerprint(file_path)
+    if metadata.get('size') != current['size']:
+        return False
+    if metadata.get('mtime_ns') == current['mtime_ns']:
+        return True
+    
+    # Same size but touched (copy, checkout, ...) - compare contents
+    return metadata.get('sha256') == _file_sha256(file_path)
+
+def _read_sidecar(file_path, columns=None, filters=None):
+    """Load the frame from a fresh sidecar, or None if missing/stale"""
+    path = sidecar_path(file_path)
+    if not os.path.exists(path):
+        return None
+    
+    try:
+        with pa.memory_map(path) as source:
+            schema = pa.ipc.open_file(source).schema
+        metadata = {k.decode(): v.decode() for k, v in (schema.metadata or {}).items()}
+        
+        if not _sidecar_is_fresh(file_path, metadata):
+            return None
+        
+        table = feather.read_table(path, columns=list(columns) if columns is not None else None)
+        
+        if filters:
+            # Evaluate the filters on their own columns, then convert only matching rows
+            keys = feather.read_table(path, columns=list(filters)).to_pandas()
+            mask = _filter_mask(keys, filters).to_numpy()
+            table = table.filter(pa.array(mask))
+        
+        return table.to_pandas()
+    except Exception:
+        # A damaged sidecar is just a cache miss
+        return None
+
+def _write_sidecar(df, file_path, fingerprint):
+    """Store the parsed frame as a columnar sidecar next to the CSV"""
+    path = sidecar_path(file_path)
+    temp_path = None
+    
+    try:
+        fd, temp_path = tempfile.mkstemp(
+            prefix=f"{os.path.basename(path)}.", suffix='.tmp', dir=os.path.dirname(path)
+        )
+        os.close(fd)
+        
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata.update({
+            b'sidecar_version': SIDECAR_VERSION.encode(),
+            b'size': fingerprint['size'].encode(),
+            b'mtime_ns': fingerprint['mtime_ns'].encode(),
+            b'sha256': fingerprint['sha256'].encode(),
+        })
+        feather.write_feather(table.replace_schema_metadata(metadata), temp_path)
+        os.chmod(temp_path, _default_file_mode())
+        os.replace(temp_path, path)
+    except Exception:
+        # Caching is best-effort; the CSV stays the source of truth
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def delta_path(file_path):
+    """Path of the append-only update log kept next to a products CSV"""
+    return f"{file_path}.delta"
+
+def _delta_files(file_path):
+    """Delta logs to merge, oldest first (one may be mid-compaction)"""
+    path = delta_path(file_path)
+    return [p for p in (f"{path}.compacting", path) if os.path.exists(p)]
+
+def _json_value(value):
+    """Make a DataFrame value JSON-serializable (missing values become null)"""
+    if value is None or value is pd.NA:
+        return None
+    if hasattr(value, 'item'):
+        value = value.item()  # numpy scalar -> Python
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+def append_deltas(updates, file_path='data/products.csv'):
+    """
+    Append row updates to the catalog's delta log instead of rewriting it
+    
+    Each changed field becomes one JSON line {id, field, value, ts}. The
+    log is fsynced, so an acknowledged checkpoint survives a crash.
+    
+    Args:
+        updates: {product_id: {field: value}} or a DataFrame with an id
+            column plus the columns to set
+        file_path (str): Path of the base products CSV
+        
+    Returns:
+        int: Number of field updates written
+    """
+    
+    if isinstance(updates, pd.DataFrame):
+        fields = [col for col in updates.columns if col != 'id']
+        updates = {
+            row['id']: {field: row[field] for field in fields}
+            for row in updates.to_dict('records')
+        }
+    
+    timestamp = datetime.now(timezone.utc).isoformat()
+    lines = []
+    for product_id, fields in updates.items():
+        for field, value in fields.items():
+            lines.append(json.dumps({
+                'id': _json_value(product_id), 'field': field,
+                'value': _json_value(value), 'ts': timestamp
+            }, ensure_ascii=False))
+    
+    if not lines:
+        return 0
+    
+    with open(delta_path(file_path), 'a', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    
+    return len(lines)
+
+def read_deltas(file_path='data/products.csv'):
+    """
+    Pending updates from the delta log, latest value per id and field
+    
+    Returns:
+        dict: {field: {product_id: value}} (empty when there is no log)
+    """
+    
+    deltas = {}
+    for path in _delta_files(file_path):
+        _read_delta_log(path, deltas)
+    return deltas
+
+def _read_delta_log(path, deltas):
+    """Fold one delta log into deltas ({field: {product_id: value}})"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A torn last line from a crash mid-append
+                continue
+            deltas.setdefault(record['field'], {})[record['id']] = record['value']
+    return deltas
+
+def _merge_deltas(df, deltas):
+    """Apply read_deltas() output to a frame with an id column"""
+    catalog = ProductCatalog(df)
+    for field, values in deltas.items():
+        catalog.bulk_update(pd.DataFrame({'id': list(values), field: list(values.values())}))
+    return catalog.df
+
+def _clear_deltas(file_path):
+    """Drop the delta logs once the base file contains their updates"""
+    for path in _delta_files(file_path):
+        os.remove(path)
+
+def compact_catalog(file_path='data/products.csv'):
+    """
+    Fold the delta log into a new base CSV
+    
+    The log is first renamed aside, so updates appended while compacting
+    go to a fresh log and are kept.
+    
+    Returns:
+        int: Number of products written (0 if there was nothing to compact)
+    """
+    
+    path = delta_path(file_path)
+    compacting = f"{path}.compacting"
+    if os.path.exists(path) and not os.path.exists(compacting):
+        os.replace(path, compacting)
+    
+    if not os.path.exists(compacting):
+        return 0
+    
+    # Merge only the log being compacted, not updates that arrived since
+    df = _merge_deltas(_load_base(file_path, None, None, True), _read_delta_log(compacting, {}))
+    _save_base(df, file_path)
+    os.remove(compacting)
+    return len(df)
+
+def _default_file_mode():
+    """Permissions a plain open() would give a new file under the current umask"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+@contextmanager
+def atomic_write(file_path, encoding='utf-8', buffering=1024 * 1024, binary=False):
+    """
+    Open a temp file next to file_path and atomically replace file_path with it
+    
+    The data is flushed and fsynced before the rename, so a crash mid-write
+    leaves the previous file intact. If the block raises, the temp file is
+    removed and file_path is untouched.
+    
+    Args:
+        file_path (str): Final path of the file
+        encoding (str): Text encoding of the file
+        buffering (int): Write buffer size in bytes
+        binary (bool): Yield a binary file object instead of a text one
+        
+    Yields:
+        file: File object to write to
+    """
+    
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(file_path)}.", suffix='.tmp', dir=directory
+    )
+    
+    try:
+        if binary:
+            f = os.fdopen(fd, 'wb', buffering=buffering)
+        else:
+            f = os.fdopen(fd, 'w', encoding=encoding, buffering=buffering)
+        
+        with f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        
+        # Keep the permissions of the file being replaced (mkstemp uses 0600)
+        if os.path.exists(file_path):
+            os.chmod(temp_path, os.stat(file_path).st_mode & 0o777)
+        else:
+            os.chmod(temp_path, _default_file_mode())
+        
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    # Persist the rename itself
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def _serialize_column(series):
+    """Render a column as CSV strings (missing values become empty strings)"""
+    if series.name == 'llm_fallback_used':
+        # Convert boolean column to string for CSV
+        series = series.astype(str)
+    
+    if series.dtype.kind in 'biufO' or pd.api.types.is_string_dtype(series.dtype):
+        text = series.astype(str)
+    else:
+        text = series.map(str)
+    
+    return text.where(series.notna(), '').tolist()
+
+def _write_rows(f, block):
+    """Serialize one block of rows and write it with a single call"""
+    if len(block) == 0:
+        return
+    columns = [_serialize_column(block.iloc[:, i]) for i in range(block.shape[1])]
+    rows = ['||'.join(values) for values in zip(*columns)]
+    f.write('\n'.join(rows) + '\n')
+
+def save_products_csv(df, file_path='data/products.csv', chunksize=50000):
     """
     Safely save the products DataFrame to CSV with proper formatting
     
+    The saved frame replaces the catalog, so any delta log for file_path
+    is cleared afterwards.
+    
     Args:
         df (pandas.DataFrame): The products data to save
         file_path (str): Path to save the CSV file
+        chunksize (int): Number of rows serialized per write
     """
     
     try:
-        # Convert boolean columns to string for CSV
-        df_copy = df.copy()
+        _save_base(df, file_path, chunksize)
+        _clear_deltas(file_path)
+    except Exception as e:
+        raise Exception(f"Failed to save CSV: {e}")
+
+def _save_base(df, file_path, chunksize=50000):
+    """Write the base CSV atomically, leaving delta logs alone"""
+    # Save with || separator via a temp file that replaces file_path atomically
+    with atomic_write(file_path) as f:
+        # Write header
+        f.write('||'.join(df.columns) + '\n')
         
-        if 'llm_fallback_used' in df_copy.columns:
-            df_copy['llm_fallback_used'] = df_copy['llm_fallback_used'].astype(str)
+        # Write data rows, one block of rows at a time
+        for start in range(0, len(df), chunksize):
+            _write_rows(f, df.iloc[start:start + chunksize])
+    
+    clear_frame_cache(file_path)
+
+def save_products_csv_chunks(chunks, columns, file_path='data/products.csv'):
+    """
+    Save products arriving as a stream of DataFrame chunks
+    
+    Same format and atomic replace as save_products_csv, without holding
+    the whole catalog in memory.
+    
+    Args:
+        chunks (iterable): DataFrames with the given columns, in row order
+        columns (list): Column names (written as the header)
+        file_path (str): Path to save the CSV file
+    """
+    
+    try:
+        with atomic_write(file_path) as f:
+            f.write('||'.join(columns) + '\n')
+            for chunk in chunks:
+                _write_rows(f, chunk[list(columns)])
         
-        # Save with || separator using manual method
-        with open(file_path, 'w', encoding='utf-8') as f:
-            # Write header
-            f.write('||'.join(df_copy.columns) + '\n')
-            
-            # Write data rows
-            for _, row in df_copy.iterrows():
-                row_data = []
-                for col in df_copy.columns:
-                    value = str(row[col]) if pd.notna(row[col]) else ''
-                    row_data.append(value)
-                f.write('||'.join(row_data) + '\n')
+        clear_frame_cache(file_path)
+        _clear_deltas(file_path)
         
     except Exception as e:
         raise Exception(f"Failed to save CSV: {e}")
@@ -98,40 +761,46 @@ def save_products_csv(df, file_path='data/products.csv'):
 def get_enhanced_products_count():
     """Get count of LLM enhanced products"""
     try:
-        df = load_products_csv()
-        enhanced = df[df['llm_fallback_used'] == True]
+        enhanced = load_products_csv(columns=['id'], filters={'llm_fallback_used': True})
         return len(enhanced)
     except:
         return 0
 
-def get_category_stats(category=None):
-    """Get statistics for all categories or a specific category"""
+def get_category_stats(category=None, df=None):
+    """
+    Get statistics for all categories or a specific category
+    
+    Args:
+        category (str): Only report this category (default: all)
+        df (pandas.DataFrame): Already loaded products data; loaded from
+            data/products.csv when omitted
+    """
     try:
-        df = load_products_csv()
+        if df is None:
+            df = load_products_csv(columns=['category', 'llm_fallback_used'])
+        
+        # One pass: rows and enhanced rows per category
+        enhanced_flags = (df['llm_fallback_used'] == True).astype(int)
+        grouped = enhanced_flags.groupby(df['category'], sort=False, observed=True).agg(['size', 'sum'])
         
         if category:
             # Single category stats
-            cat_products = df[df['category'] == category]
-            enhanced = cat_products[cat_products['llm_fallback_used'] == True]
+            total = int(grouped.at[category, 'size']) if category in grouped.index else 0
+            enhanced = int(grouped.at[category, 'sum']) if category in grouped.index else 0
             
             return {
-                f'total_{category}': len(cat_products),
-                f'enhanced_{category}': len(enhanced),
-                'enhancement_rate': len(enhanced) / len(cat_products) * 100 if len(cat_products) > 0 else 0
+                f'total_{category}': total,
+                f'enhanced_{category}': enhanced,
+                'enhancement_rate': enhanced / total * 100 if total > 0 else 0
             }
         else:
             # All categories stats
             stats = {}
-            for cat in df['category'].unique():
-                if pd.isna(cat):
-                    continue
-                cat_products = df[df['category'] == cat]
-                enhanced = cat_products[cat_products['llm_fallback_used'] == True]
-                
+            for cat, total, enhanced in zip(grouped.index, grouped['size'].tolist(), grouped['sum'].tolist()):
                 stats[cat] = {
-                    'total': len(cat_products),
-                    'enhanced': len(enhanced),
-                    'enhancement_rate': len(enhanced) / len(cat_products) * 100 if len(cat_products) > 0 else 0
+                    'total': total,
+                    'enhanced': enhanced,
+                    'enhancement_rate': enhanced / total * 100 if total > 0 else 0
                 }
             
             return stats
@@ -139,6 +808,101 @@ def get_category_stats(category=None):
         print(f"Error getting category stats: {e}")
         return {} if not category else {'total': 0, 'enhanced': 0, 'enhancement_rate': 0}
 
+class ProductCatalog:
+    """
+    Products DataFrame with a hash index on the product id
+    
+    Lookups and updates by id are O(1) instead of a boolean scan of the
+    whole frame. The index maps each id to its row position (first
+    occurrence wins for duplicate ids) and follows id changes made through
+    update/bulk_update. Edits go to the wrapped frame in place.
+    """
+    
+    def __init__(self, df, id_column='id'):
+        self.df = df
+        self.id_column = id_column
+        self._positions = {}
+        for position, product_id in enumerate(df[id_column].tolist()):
+            self._positions.setdefault(product_id, position)
+    
+    def __len__(self):
+        return len(self.df)
+    
+    def __contains__(self, product_id):
+        return product_id in self._positions
+    
+    def position(self, product_id):
+        """Row position of a product, or None if the id is unknown"""
+        return self._positions.get(product_id)
+    
+    def get(self, product_id):
+        """Row of a product as a Series, or None if the id is unknown"""
+        position = self._positions.get(product_id)
+        return self.df.iloc[position] if position is not None else None
+    
+    def update(self, product_id, fields):
+        """
+        Set fields (column -> value) on one product
+        
+        Returns:
+            bool: False if the id is unknown
+        """
+        position = self._positions.get(product_id)
+        if position is None:
+            return False
+        
+        for col, value in fields.items():
+            self._set_values(col, [position], [value])
+        
+        # Keep the index in step when the id itself changes
+        new_id = fields.get(self.id_column, product_id)
+        if new_id != product_id:
+            del self._positions[product_id]
+            self._positions.setdefault(new_id, position)
+        
+        return True
+    
+    def bulk_update(self, frame):
+        """
+        Apply a frame of updates (an id column plus the columns to set)
+        
+        Rows are matched by id through the index, then each column is
+        written with one vectorized assignment.
+        
+        Returns:
+            dict: {'updated': count, 'not_found': [ids]}
+        """
+        ids = frame[self.id_column].tolist()
+        rows, positions, not_found = [], [], []
+        for row_number, product_id in enumerate(ids):
+            position = self._positions.get(product_id)
+            if position is None:
+                not_found.append(product_id)
+            else:
+                rows.append(row_number)
+                positions.append(position)
+        
+        if positions:
+            matched = frame.iloc[rows]
+            for col in frame.columns:
+                if col != self.id_column:
+                    self._set_values(col, positions, matched[col].tolist())
+        
+        return {'updated': len(positions), 'not_found': not_found}
+    
+    def _set_values(self, col, positions, values):
+        """Write values at row positions, widening the column dtype if needed"""
+        if col not in self.df.columns:
+            self.df[col] = pd.Series([None] * len(self.df), index=self.df.index, dtype=object)
+        
+        col_idx = self.df.columns.get_loc(col)
+        try:
+            self.df.iloc[positions, col_idx] = values
+        except (TypeError, ValueError):
+            # e.g. a float into a string column - fall back to object
+            self.df[col] = self.df[col].astype(object)
+            self.df.iloc[positions, col_idx] = values
+
 # Backward compatibility
 def get_beverage_stats():
     """Legacy function - use get_category_stats('beverage') instead"""
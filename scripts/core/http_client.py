@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+HTTP Client - Shared pooled session for LLM, Ollama and OpenFoodFacts calls
+Reuses keep-alive connections per host instead of opening a new TCP/TLS
+connection for every request, and retries transient failures with backoff
+"""
+
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Connections kept open per host (sized to the concurrency each host sees)
+DEFAULT_POOL_SIZE = 10
+HOST_POOL_SIZES = {
+    'http://localhost:11434': 8,            # Ollama (local model server)
+    'https://api.groq.com': 10,
+    'https://api-inference.huggingface.co': 5,
+    'https://world.openfoodfacts.org': 4,
+}
+
+# Retries for connection failures and retryable status codes. Read timeouts
+# are not retried: a model that took the full timeout will likely do it again.
+# 429 is left to the caller: sleeping out a provider's Retry-After here would
+# blow the caller's latency budget and bypass its RateLimiter
+RETRY_TOTAL = 2
+RETRY_BACKOFF = 0.5  # seconds, doubled each retry
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+MAX_RETRY_AFTER = 2  # seconds; a longer Retry-After (e.g. on a 503) is capped
+
+# (connect, read) timeout used when a caller doesn't pass one
+DEFAULT_TIMEOUT = (5, 30)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class _TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies DEFAULT_TIMEOUT when no timeout is given"""
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = DEFAULT_TIMEOUT
+        return super().send(request, **kwargs)
+
+
+class _CappedRetry(Retry):
+    """Retry that honours Retry-After only up to MAX_RETRY_AFTER seconds (and never for 429)"""
+
+    # urllib3 retries these whenever they carry Retry-After, whatever status_forcelist says
+    RETRY_AFTER_STATUS_CODES = frozenset({503})
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return min(retry_after, MAX_RETRY_AFTER) if retry_after is not None else None
+
+
+def _make_adapter(pool_size: int) -> HTTPAdapter:
+    retry = _CappedRetry(
+        total=RETRY_TOTAL,
+        read=0,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=None,  # LLM/lookup POSTs are safe to repeat
+        raise_on_status=False,
+        respect_retry_after_header=True
+    )
+    return _TimeoutHTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+def create_session(host_pool_sizes: Optional[Dict[str, int]] = None) -> requests.Session:
+    """New pooled session with per-host adapters, retries and default timeouts"""
+    session = requests.Session()
+    session.mount('http://', _make_adapter(DEFAULT_POOL_SIZE))
+    session.mount('https://', _make_adapter(DEFAULT_POOL_SIZE))
+
+    # requests picks the longest matching prefix, so these take precedence
+    for prefix, pool_size in (host_pool_sizes or HOST_POOL_SIZES).items():
+        session.mount(prefix, _make_adapter(pool_size))
+    return session
+
+def get_session() -> requests.Session:
+    """The process-wide pooled session (created on first use, shared by all threads)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+def close_session() -> None:
+    """Close the shared session's connections"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
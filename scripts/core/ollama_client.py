@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Ollama Client - Streaming generation and warm-up for the local model server
+Reads /api/generate as a token stream and hangs up as soon as the caller
+has every field it needs; Ollama cancels a generation when its client
+disconnects, so the model stops producing text nobody will parse.
+Models are preloaded with a keep_alive so batches don't pay the load, and
+a reload mid-run (keep_alive expired) is reported apart from the latency
+"""
+
+import os
+import re
+import json
+import time
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from http_client import get_session
+from prompt_batching import split_batch_response
+
+NUTRITION_FIELDS = (
+    "energy_kcal_per_100g", "carbs_g_per_100g", "total_sugars_g_per_100g",
+    "protein_g_per_100g", "fat_g_per_100g", "saturated_fat_g_per_100g",
+    "fiber_g_per_100g", "sodium_mg_per_100g", "salt_g_per_100g"
+)
+# Stop only after processing_notes, the template's last line: batch CSVs carry
+# data_source and processing_notes, and parse_llama_response has no defaults for them
+REQUIRED_FIELDS = NUTRITION_FIELDS + ("confidence_score", "data_source", "processing_notes")
+
+# How long Ollama keeps a model loaded after its last request (Ollama's own default is 5m)
+DEFAULT_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+
+
+def has_fields(text: str, fields: Iterable[str] = REQUIRED_FIELDS) -> bool:
+    """
+    True once every field has a value on a finished line ("field: value\\n")
+
+    A line still being streamed doesn't count, since its value may be cut short
+    """
+    return all(
+        re.search(rf'^[ \t]*{re.escape(field)}[ \t]*:[ \t]*\S[^\n]*\n', text, re.MULTILINE)
+        for field in fields
+    )
+
+def batch_has_fields(text: str, count: int, fields: Iterable[str] = REQUIRED_FIELDS) -> bool:
+    """True once every product section of a batched response has all fields"""
+    finished = text[:text.rfind('\n') + 1]  # drop the line still being streamed
+    return all(
+        section is not None and has_fields(section + '\n', fields)
+        for section in split_batch_response(finished, count)
+    )
+
+def stream_generate(url: str, payload: dict, is_complete: Optional[Callable[[str], bool]] = None,
+                    timeout: Optional[float] = None, headers: Optional[dict] = None,
+                    cancel: Optional[threading.Event] = None) -> Tuple[Optional[str], bool, Optional[float]]:
+    """
+    Run a streaming /api/generate request, stopping early once is_complete(text)
+
+    Args:
+        url: Ollama /api/generate endpoint
+        payload: Request body ("stream" is forced on)
+        is_complete: Checked on the text so far after each finished line
+        timeout: Seconds allowed for the whole generation (also the read
+            timeout between streamed chunks, which alone wouldn't bound it)
+        headers: Extra request headers
+        cancel: Set by the caller when the result is no longer wanted; the
+            generation is abandoned at the next chunk
+
+    Returns:
+        (text, stopped_early, load_seconds); text is None if the request
+        failed. load_seconds is the model load Ollama reports in the final
+        chunk (load_duration), None if the stream ended before it
+    """
+    if cancel is not None and cancel.is_set():
+        return None, False, None
+
+    payload = dict(payload, stream=True)
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    text = []
+    with get_session().post(url, json=payload, headers=headers, timeout=timeout, stream=True) as response:
+        if response.status_code != 200:
+            print(f"  ❌ Ollama error: {response.status_code}")
+            return None, False, None
+
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("error"):
+                print(f"  ❌ Ollama error: {chunk['error']}")
+                return None, False, None
+
+            token = chunk.get("response", "")
+            text.append(token)
+            if chunk.get("done"):
+                load_duration = chunk.get("load_duration")  # nanoseconds
+                return ''.join(text), False, load_duration / 1e9 if load_duration is not None else None
+
+            # Closing the response unread drops the connection, which aborts the generation
+            if is_complete and '\n' in token and is_complete(''.join(text)):
+                return ''.join(text), True, None
+
+            if deadline is not None and time.monotonic() > deadline:
+                print(f"  ❌ Ollama generation exceeded {timeout}s, abandoning it")
+                return None, False, None
+
+            if cancel is not None and cancel.is_set():
+                return None, False, None
+
+    return ''.join(text), False, None
+
+def warm_up(url: str, model: str, keep_alive: str = DEFAULT_KEEP_ALIVE, timeout=(5, 300)) -> Dict:
+    """
+    Load a model ahead of the first real request and pin it for keep_alive
+
+    A /api/generate call without a prompt only loads the model. Ollama
+    reports the load in load_duration, which is near zero if the model was
+    already resident.
+
+    Returns:
+        Dict with model, loaded, load_seconds, wall_seconds and error
+    """
+    start = time.time()
+    try:
+        response = get_session().post(url, json={"model": model, "keep_alive": keep_alive}, timeout=timeout)
+        wall_seconds = time.time() - start
+        if response.status_code != 200:
+            return {"model": model, "loaded": False, "load_seconds": None,
+                    "wall_seconds": round(wall_seconds, 2), "error": f"HTTP {response.status_code}"}
+
+        load_duration = response.json().get("load_duration")  # nanoseconds
+        load_seconds = load_duration / 1e9 if load_duration is not None else wall_seconds
+        return {"model": model, "loaded": True, "load_seconds": round(load_seconds, 2),
+                "wall_seconds": round(wall_seconds, 2), "error": None}
+    except Exception as e:
+        return {"model": model, "loaded": False, "load_seconds": None,
+                "wall_seconds": round(time.time() - start, 2), "error": str(e)}
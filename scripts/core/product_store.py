@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Product Store - Storage backends for the product catalog
+CSVProductStore wraps the || separated products.csv; SQLiteProductStore keeps
+the catalog in an indexed SQLite database so changing a row only touches
+that row and readers can run while a writer is active
+"""
+
+import os
+import sys
+import math
+import sqlite3
+import argparse
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+from csv_handler import (load_products_csv, save_products_csv, save_products_csv_chunks,
+                         iter_products_csv, ProductCatalog, NUMERIC_COLUMNS)
+
+# Columns with a secondary index in the SQLite backend (id is the primary key)
+INDEXED_COLUMNS = ['category', 'subcategory', 'source', 'llm_fallback_used']
+
+
+class ProductStore(ABC):
+    """Interface shared by the product catalog backends"""
+
+    @abstractmethod
+    def load(self, columns: List[str] = None, filters: Dict = None) -> pd.DataFrame:
+        """Load products as a typed DataFrame (same dtypes as load_products_csv)"""
+
+    @abstractmethod
+    def save(self, df: pd.DataFrame) -> None:
+        """Replace the whole catalog with df"""
+
+    @abstractmethod
+    def get(self, product_id: str) -> Optional[Dict]:
+        """Fields of one product, or None if the id is unknown"""
+
+    @abstractmethod
+    def update(self, product_id: str, fields: Dict) -> bool:
+        """Set fields on one product; False if the id is unknown"""
+
+    @abstractmethod
+    def bulk_update(self, frame: pd.DataFrame) -> Dict:
+        """Apply a frame of updates keyed by its id column"""
+
+    def count(self, filters: Dict = None) -> int:
+        """Number of products matching filters"""
+        return len(self.load(columns=['id'], filters=filters))
+
+
+class CSVProductStore(ProductStore):
+    """The products.csv file; every write rewrites the whole file"""
+
+    def __init__(self, file_path: str = 'data/products.csv'):
+        self.file_path = file_path
+
+    def load(self, columns: List[str] = None, filters: Dict = None) -> pd.DataFrame:
+        return load_products_csv(self.file_path, columns=columns, filters=filters)
+
+    def save(self, df: pd.DataFrame) -> None:
+        save_products_csv(df, self.file_path)
+
+    def get(self, product_id: str) -> Optional[Dict]:
+        matches = self.load(filters={'id': product_id})
+        return matches.iloc[0].to_dict() if len(matches) > 0 else None
+
+    def update(self, product_id: str, fields: Dict) -> bool:
+        catalog = ProductCatalog(self.load())
+        if not catalog.update(product_id, fields):
+            return False
+        self.save(catalog.df)
+        return True
+
+    def bulk_update(self, frame: pd.DataFrame) -> Dict:
+        catalog = ProductCatalog(self.load())
+        result = catalog.bulk_update(frame)
+        if result['updated'] > 0:
+            self.save(catalog.df)
+        return result
+
+
+class SQLiteProductStore(ProductStore):
+    """
+    Product catalog in SQLite (WAL mode)
+
+    Columns are created on demand without a declared type, so values keep
+    the Python type they were written with and export back to the same
+    text. Row order follows insertion (rowid).
+    """
+
+    def __init__(self, db_path: str = 'data/products.db'):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.skipped_duplicates = 0  # rows dropped by the last save/import_csv
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS products (id TEXT PRIMARY KEY)")
+        self.conn.commit()
+        self._columns = self._read_columns()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        """Close the database connection"""
+        self.conn.close()
+
+    @property
+    def columns(self) -> List[str]:
+        """Catalog columns in order"""
+        return list(self._columns)
+
+    def _read_columns(self) -> List[str]:
+        return [row[1] for row in self.conn.execute("PRAGMA table_info(products)")]
+
+    def _ensure_columns(self, columns: List[str]) -> None:
+        """Add missing columns (and their indexes) to the products table"""
+        for col in columns:
+            if col in self._columns:
+                continue
+            self.conn.execute(f"ALTER TABLE products ADD COLUMN {_quote(col)}")
+            self._columns.append(col)
+            if col in INDEXED_COLUMNS:
+                self.conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {_quote('idx_products_' + col)} ON products ({_quote(col)})"
+                )
+
+    def _where(self, filters: Dict) -> tuple:
+        """WHERE clause and parameters for a filters dict"""
+        if not filters:
+            return '', []
+
+        clauses, params = [], []
+        for col, value in filters.items():
+            if col not in self._columns:
+                raise KeyError(f"Column not found in {self.db_path}: {col}")
+            values = list(value) if isinstance(value, (list, tuple, set, frozenset)) else [value]
+            clauses.append(f"{_quote(col)} IN ({', '.join('?' * len(values))})")
+            params.extend(_to_sql(col, v) for v in values)
+        return ' WHERE ' + ' AND '.join(clauses), params
+
+    def iter_chunks(self, columns: List[str] = None, filters: Dict = None,
+                    chunksize: int = 50000) -> Iterator[pd.DataFrame]:
+        """Stream products as typed DataFrame chunks in row order"""
+        columns = list(columns) if columns is not None else self.columns
+        for col in columns:
+            if col not in self._columns:
+                raise KeyError(f"Column not found in {self.db_path}: {col}")
+
+        where, params = self._where(filters)
+        select = ', '.join(_quote(col) for col in columns)
+
+        # Separate cursor on its own connection so long reads don't block writers
+        reader = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            cursor = reader.execute(f"SELECT {select} FROM products{where} ORDER BY rowid", params)
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                yield _to_frame(rows, columns)
+        finally:
+            reader.close()
+
+    def load(self, columns: List[str] = None, filters: Dict = None) -> pd.DataFrame:
+        chunks = list(self.iter_chunks(columns, filters))
+        if not chunks:
+            return _to_frame([], list(columns) if columns is not None else self.columns)
+        return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+    def count(self, filters: Dict = None) -> int:
+        where, params = self._where(filters)
+        with self._lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM products{where}", params).fetchone()[0]
+
+    def _insert_frames(self, frames) -> int:
+        """
+        Insert DataFrames (first occurrence of an id wins); returns rows inserted
+
+        Rows dropped as duplicate ids are counted in skipped_duplicates and reported
+        """
+        inserted, total = 0, 0
+        for df in frames:
+            total += len(df)
+            self._ensure_columns(list(df.columns))
+            names = ', '.join(_quote(col) for col in df.columns)
+            marks = ', '.join('?' * len(df.columns))
+            cursor = self.conn.executemany(
+                f"INSERT OR IGNORE INTO products ({names}) VALUES ({marks})",
+                _rows_to_sql(df)
+            )
+            inserted += cursor.rowcount
+
+        self.skipped_duplicates = total - inserted
+        if self.skipped_duplicates:
+            print(f"⚠️ Skipped {self.skipped_duplicates:,} rows with duplicate ids "
+                  f"(first occurrence kept) in {self.db_path}")
+        return inserted
+
+    def save(self, df: pd.DataFrame) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM products")
+            self._insert_frames([df])
+
+    def import_csv(self, csv_path: str = 'data/products.csv', chunksize: int = 50000) -> int:
+        """Replace the catalog with the contents of a products CSV"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM products")
+            return self._insert_frames(iter_products_csv(csv_path, chunksize=chunksize))
+
+    def export_csv(self, csv_path: str = 'data/products.csv', chunksize: int = 50000) -> None:
+        """Write the catalog to a || separated products CSV"""
+        save_products_csv_chunks(self.iter_chunks(chunksize=chunksize), self.columns, csv_path)
+
+    def get(self, product_id: str) -> Optional[Dict]:
+        frame = self.load(filters={'id': product_id})
+        return frame.iloc[0].to_dict() if len(frame) > 0 else None
+
+    def update(self, product_id: str, fields: Dict) -> bool:
+        if not fields:
+            return self.get(product_id) is not None
+
+        with self._lock, self.conn:
+            self._ensure_columns(list(fields))
+            assignments = ', '.join(f"{_quote(col)} = ?" for col in fields)
+            params = [_to_sql(col, value) for col, value in fields.items()] + [product_id]
+            cursor = self.conn.execute(f"UPDATE products SET {assignments} WHERE id = ?", params)
+            return cursor.rowcount > 0
+
+    def bulk_update(self, frame: pd.DataFrame, id_column: str = 'id') -> Dict:
+        fields = [col for col in frame.columns if col != id_column]
+        updated, not_found = 0, []
+
+        with self._lock, self.conn:
+            self._ensure_columns(fields)
+            assignments = ', '.join(f"{_quote(col)} = ?" for col in fields)
+            sql = f"UPDATE products SET {assignments} WHERE id = ?"
+
+            for product_id, values in zip(frame[id_column].tolist(), _rows_to_sql(frame[fields])):
+                if self.conn.execute(sql, list(values) + [product_id]).rowcount > 0:
+                    updated += 1
+                else:
+                    not_found.append(product_id)
+
+        return {'updated': updated, 'not_found': not_found}
+
+
+def _quote(name: str) -> str:
+    """Quote an SQL identifier"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _to_sql(col: str, value):
+    """Convert one DataFrame value to an SQLite parameter"""
+    if value is None or value is pd.NA:
+        return None
+    if hasattr(value, 'item'):
+        value = value.item()  # numpy scalar -> Python
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if col == 'llm_fallback_used':
+        return 1 if value is True or value == 'True' else 0
+    return value
+
+def _rows_to_sql(df: pd.DataFrame):
+    """Rows of a DataFrame as tuples of SQLite parameters"""
+    columns = list(df.columns)
+    for values in zip(*(df.iloc[:, i].tolist() for i in range(len(columns)))):
+        yield tuple(_to_sql(col, value) for col, value in zip(columns, values))
+
+def _to_frame(rows: List[tuple], columns: List[str]) -> pd.DataFrame:
+    """Build a typed products frame from SQLite rows"""
+    df = pd.DataFrame(rows, columns=columns)
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    if 'llm_fallback_used' in df.columns:
+        df['llm_fallback_used'] = df['llm_fallback_used'].fillna(0).astype(bool)
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert between products.csv and the SQLite product store')
+    parser.add_argument('command', choices=['import', 'export'],
+                       help='import: CSV -> SQLite, export: SQLite -> CSV')
+    parser.add_argument('--csv', default='data/products.csv',
+                       help='Products CSV path (default: data/products.csv)')
+    parser.add_argument('--db', default='data/products.db',
+                       help='SQLite database path (default: data/products.db)')
+
+    args = parser.parse_args()
+
+    with SQLiteProductStore(args.db) as store:
+        if args.command == 'import':
+            count = store.import_csv(args.csv)
+            print(f"✅ Imported {count:,} products from {args.csv} into {args.db}")
+        else:
+            store.export_csv(args.csv)
+            print(f"✅ Exported {store.count():,} products from {args.db} to {args.csv}")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Prompt Batching - Pack several products into one LLM prompt
+Products are listed as numbered blocks and the model answers each under
+a "=== PRODUCT n ===" marker, so the response can be split back by index
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# Answer marker line: "=== PRODUCT 3 ===" (tolerates #, *, : and missing =)
+_MARKER_PATTERN = re.compile(r'^[ \t=#*]*PRODUCT[ \t]+(\d+)[ \t=#*:]*$', re.IGNORECASE | re.MULTILINE)
+
+
+def format_products_block(products: List[Dict], fields: List[Tuple[str, str]]) -> str:
+    """
+    Numbered product descriptions for a batched prompt
+
+    Args:
+        products: Product dicts (or rows)
+        fields: (label, key) pairs to include; empty values are left out
+    """
+    blocks = []
+    for index, product in enumerate(products, 1):
+        lines = [f"PRODUCT {index}:"]
+        for label, key in fields:
+            value = product.get(key)
+            if value is None or value == '' or (isinstance(value, float) and pd.isna(value)):
+                continue
+            lines.append(f"{label}: {value}")
+        blocks.append('\n'.join(lines))
+    return '\n\n'.join(blocks)
+
+def nutrition_fields_template(for_each: bool = False) -> str:
+    """REQUIRED FIELDS section shared by the single and batched nutrition prompts"""
+    scope = " for EACH product" if for_each else ""
+    return f"""REQUIRED FIELDS - Provide as field-value pairs{scope}:
+
+NUTRITION (per 100g/100ml):
+energy_kcal_per_100g: <number>
+carbs_g_per_100g: <number>
+total_sugars_g_per_100g: <number>
+protein_g_per_100g: <number>
+fat_g_per_100g: <number>
+saturated_fat_g_per_100g: <number>
+fiber_g_per_100g: <number>
+sodium_mg_per_100g: <number>
+salt_g_per_100g: <number>
+
+PRODUCT INFO:
+ingredients_list: ingredient1, ingredient2, ingredient3
+serving_size: 30g
+servings_per_container: 7
+
+QUALITY:
+confidence_score: 0.85
+data_source: Brand official website
+processing_notes: Verified from Indian nutrition label"""
+
+def batch_output_instructions(count: int) -> str:
+    """Instructions telling the model how to delimit per-product answers"""
+    return f"""OUTPUT FORMAT:
+Answer for all {count} products, in the order given. Start each answer with
+its marker line, followed by that product's field-value pairs:
+
+=== PRODUCT 1 ===
+energy_kcal_per_100g: <number>
+...
+=== PRODUCT {count} ===
+energy_kcal_per_100g: <number>
+...
+
+Do not skip or merge products. No text outside the marked sections."""
+
+def split_batch_response(text: str, count: int) -> List[Optional[str]]:
+    """
+    Split a batched response into per-product sections by marker index
+
+    Returns a list of length count; products whose section is missing or
+    empty are None (the caller retries those individually)
+    """
+    sections = [None] * count
+    if not text:
+        return sections
+
+    markers = list(_MARKER_PATTERN.finditer(text))
+    for marker, following in zip(markers, markers[1:] + [None]):
+        index = int(marker.group(1)) - 1
+        end = following.start() if following is not None else len(text)
+        section = text[marker.end():end].strip()
+        if 0 <= index < count and sections[index] is None and section:
+            sections[index] = section
+    return sections
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter - Thread-safe request budgets for external APIs
+Token buckets for per-minute and per-hour limits: constant time per
+request, shared safely between threads, with a blocking acquire so batch
+jobs wait for capacity instead of giving up. Buckets are sized so that
+no window of the period ever admits more than the limit
+"""
+
+import time
+import threading
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """
+    Enforces at most `limit` requests in any `period`-second window
+
+    Holds up to `burst` tokens and refills the rest of the limit over the
+    period. Any window can then admit at most burst + (limit - burst) = limit
+    requests, whereas a full bucket of `limit` would admit nearly 2x.
+    """
+
+    def __init__(self, limit: float, period: float, burst: float = 1):
+        burst = min(max(int(burst), 1), limit)
+        # Grants are whole, so burst + refill only has to stay below limit + 1
+        refill = limit - burst if limit > burst else limit * 0.99
+        self.capacity = float(burst)
+        self.rate = refill / period  # tokens per second
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until one token is available (call after refill)"""
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Per-provider request limiter
+
+    Each configured limit is a token bucket; a request needs a token from
+    every bucket. Limits of None (or infinity) are not enforced.
+    burst_ratio is the share of each limit available at once (at least one
+    request); the rest is spread evenly over the period.
+    """
+
+    def __init__(self, per_minute: Optional[float] = None, per_hour: Optional[float] = None,
+                 burst_ratio: float = 0.1):
+        self.per_minute = per_minute
+        self.per_hour = per_hour
+        self._buckets = [
+            TokenBucket(limit, period, limit * burst_ratio)
+            for limit, period in ((per_minute, 60), (per_hour, 3600))
+            if limit is not None and limit != float('inf')
+        ]
+        self._condition = threading.Condition()
+        self._acquired = 0
+        self._rejected = 0
+        self._waited_seconds = 0.0
+
+    def _refill(self) -> float:
+        """Refill all buckets; returns seconds until a request can go through"""
+        now = time.monotonic()
+        for bucket in self._buckets:
+            bucket.refill(now)
+        return max((bucket.wait_time() for bucket in self._buckets), default=0.0)
+
+    def _take(self) -> None:
+        for bucket in self._buckets:
+            bucket.tokens -= 1
+        self._acquired += 1
+
+    def try_acquire(self) -> bool:
+        """Take capacity for one request if available right now"""
+        return self.acquire(timeout=0)
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Take capacity for one request, waiting for it if needed
+
+        Args:
+            timeout: Max seconds to wait (None waits indefinitely, 0 never waits)
+
+        Returns:
+            True if the request may proceed, False if the timeout expired
+        """
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+
+        with self._condition:
+            while True:
+                wait = self._refill()
+                if wait == 0:
+                    self._take()
+                    self._waited_seconds += time.monotonic() - start
+                    return True
+
+                if deadline is not None and wait > deadline - time.monotonic():
+                    self._rejected += 1
+                    return False
+                self._condition.wait(wait)
+
+    def time_until_available(self) -> float:
+        """Seconds until a request could go through (0 if one can now)"""
+        with self._condition:
+            return self._refill()
+
+    def remaining(self) -> float:
+        """Requests that could be made right now without waiting"""
+        with self._condition:
+            self._refill()
+            if not self._buckets:
+                return float('inf')
+            return int(min(bucket.tokens for bucket in self._buckets))
+
+    def get_stats(self) -> Dict:
+        """Limits, current budget and counters"""
+        with self._condition:
+            wait = self._refill()
+            remaining = int(min(bucket.tokens for bucket in self._buckets)) if self._buckets else None
+            return {
+                'per_minute': self.per_minute,
+                'per_hour': self.per_hour,
+                'remaining': remaining,
+                'available_in_seconds': round(wait, 2),
+                'acquired': self._acquired,
+                'rejected': self._rejected,
+                'waited_seconds': round(self._waited_seconds, 2)
+            }
@@ -9,13 +9,13 @@ import os
 import sys
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime
-import shutil
 
 # Add parent directories to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'core'))
 sys.path.append(os.path.join(os.path.dirname(__file__)))
 
 from csv_handler import load_products_csv, save_products_csv
+from catalog_backup import create_backup
 from category_manager import CategoryManager
 
 
@@ -34,19 +34,13 @@ class MigrationEngine:
         }
     
     def create_backup(self, backup_suffix: str = None) -> str:
-        """Create backup of current products.csv"""
+        """Snapshot current products.csv into the deduplicated backup store"""
         if backup_suffix is None:
             backup_suffix = datetime.now().strftime('%Y%m%d_%H%M%S')
         
-        backup_dir = 'data/backups'
-        os.makedirs(backup_dir, exist_ok=True)
-        
-        source = 'data/products.csv'
-        backup_path = f'{backup_dir}/products_pre_migration_{backup_suffix}.csv'
-        
-        shutil.copy2(source, backup_path)
-        print(f"✅ Backup created: {backup_path}")
-        return backup_path
+        snapshot_id = create_backup('data/products.csv', label=f'pre_migration_{backup_suffix}')
+        print(f"✅ Backup created: snapshot {snapshot_id}")
+        return snapshot_id
     
     def analyze_migration_impact(self, df: pd.DataFrame) -> Dict:
         """Analyze what changes will be made during migration"""
@@ -4,11 +4,16 @@ LLM Classification Service using Local Ollama/Llama
 Dedicated service for product classification and name cleanup
 """
 
-import requests
 import json
 import time
+import sys
+import os
 from typing import Dict, Optional
 
+# Add parent directories to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'core'))
+from http_client import get_session
+
 
 class LLMClassificationService:
     """Local Llama-based classification service"""
@@ -21,7 +26,7 @@ class LLMClassificationService:
     def test_connection(self) -> bool:
         """Test if Ollama is running and accessible"""
         try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=5)
+            response = get_session().get("http://localhost:11434/api/tags", timeout=5)
             if response.status_code == 200:
                 models = response.json().get('models', [])
                 available_models = [model['name'] for model in models]
@@ -102,7 +107,7 @@ reasoning: [brief]"""
             
             print(f"  -> Calling Llama model: {self.model}")
             
-            response = requests.post(
+            response = get_session().post(
                 self.ollama_url,
                 headers={"Content-Type": "application/json"},
                 json=payload,
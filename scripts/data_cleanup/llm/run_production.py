@@ -17,7 +17,7 @@ from product_classifier import ProductClassifier
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'core'))
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
 
-from csv_handler import load_products_csv, save_products_csv
+from csv_handler import load_products_csv, append_deltas, compact_catalog
 
 
 def run_production_classification(min_name_length=80, batch_size=100, delay_seconds=1):
@@ -60,6 +60,9 @@ def run_production_classification(min_name_length=80, batch_size=100, delay_seco
     print(f"   - Delay between calls: {delay_seconds}s")
     print()
     
+    # Changed fields since the last checkpoint: {product_id: {field: value}}
+    pending_updates = {}
+    
     # Track progress
     processed = 0
     updated = 0
@@ -88,19 +91,22 @@ def run_production_classification(min_name_length=80, batch_size=100, delay_seco
             # Update if we got a clean name
             if result.get('clean_product_name') and result['clean_product_name'] != row['product_name']:
                 df.at[idx, 'product_name'] = result['clean_product_name']
+                pending_updates.setdefault(row['id'], {})['product_name'] = result['clean_product_name']
                 updated += 1
             
             # Update subcategory if changed
             if result.get('new_subcategory') and result['new_subcategory'] != row['subcategory']:
                 df.at[idx, 'subcategory'] = result['new_subcategory']
+                pending_updates.setdefault(row['id'], {})['subcategory'] = result['new_subcategory']
             
             # Add delay to prevent overload
             time.sleep(delay_seconds)
             
-            # Save checkpoint every batch_size products
+            # Save checkpoint every batch_size products (appends changed rows to the delta log)
             if processed % batch_size == 0:
                 print(f"\n💾 Saving checkpoint at {processed} products...")
-                save_products_csv(df)
+                append_deltas(pending_updates)
+                pending_updates = {}
                 print(f"✅ Checkpoint saved\n")
         
         except Exception as e:
@@ -108,9 +114,10 @@ def run_production_classification(min_name_length=80, batch_size=100, delay_seco
             print(f"❌ Error processing product {idx}: {e}")
             continue
     
-    # Final save
+    # Final save: fold all checkpointed changes into products.csv
     print(f"\n💾 Saving final results...")
-    save_products_csv(df)
+    append_deltas(pending_updates)
+    compact_catalog()
     
     # Summary
     elapsed = time.time() - start_time
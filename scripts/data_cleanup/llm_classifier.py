@@ -16,6 +16,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'external_services'))
 
 from csv_handler import load_products_csv, save_products_csv
+from http_client import get_session
 from llm_nutrition_service import LLMNutritionService
 
 
@@ -166,8 +167,6 @@ classification_reasoning: <brief explanation>"""
         Call LLM API for classification (separate from nutrition extraction)
         Uses same LLM (Groq) but dedicated method for classification
         """
-        import requests
-        
         # Try Groq API (same as nutrition service uses)
         try:
             # Check if we can make request
@@ -183,16 +182,13 @@ classification_reasoning: <brief explanation>"""
                 "temperature": 0.3
             }
             
-            response = requests.post(
+            response = get_session().post(
                 self.llm_service.providers["groq"]["url"],
                 headers=self.llm_service.providers["groq"]["headers"],
                 json=payload,
                 timeout=self.llm_service.providers["groq"]["timeout"]
             )
             
-            # Track request
-            self.llm_service.request_timestamps["groq"].append(time.time())
-            
             if response.status_code == 200:
                 content = response.json()["choices"][0]["message"]["content"]
                 print(f"  -> Got LLM response ({len(content)} chars)")
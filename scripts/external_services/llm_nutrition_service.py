@@ -1,14 +1,24 @@
 import json
 import time
 import os
-import requests
 from typing import Dict, List, Optional, Tuple
 import pandas as pd
 from datetime import datetime, timezone
 import sqlite3
 import hashlib
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import sys
+import queue
+from contextlib import contextmanager
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+# Add parent directories to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
+from rate_limiter import RateLimiter
+from http_client import get_session
+from prompt_batching import format_products_block, nutrition_fields_template, batch_output_instructions, split_batch_response
+from ollama_client import stream_generate, has_fields, batch_has_fields, warm_up, DEFAULT_KEEP_ALIVE
 
 class LLMNutritionService:
     """
@@ -16,10 +26,45 @@ class LLMNutritionService:
     Uses multiple free LLM providers with intelligent fallbacks
     """
     
-    def __init__(self, cache_db_path: str = "llm_cache.db"):
+    # Cache queries, kept as constants so each connection's statement cache reuses them
+    CACHE_SELECT_SQL = (
+        "SELECT nutrition_data, confidence_score, created_at FROM nutrition_cache WHERE product_hash = ?"
+    )
+    CACHE_INSERT_SQL = '''
+            INSERT OR REPLACE INTO nutrition_cache 
+            (product_hash, product_name, brand, category, nutrition_data, confidence_score, created_at, model_used)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+    
+    def __init__(self, cache_db_path: str = "llm_cache.db",
+                 memory_cache_size: int = 2048, memory_cache_ttl: float = 3600,
+                 connection_pool_size: int = 8):
         self.cache_db_path = cache_db_path
+        
+        # In-process LRU of parsed cache entries in front of SQLite: product_hash -> (expires_at, result)
+        self.memory_cache_size = memory_cache_size
+        self.memory_cache_ttl = memory_cache_ttl
+        self._memory_cache = OrderedDict()
+        self._memory_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+        self._memory_cache_lock = threading.Lock()
+        
+        # Bounded pool of cache connections, checked out per query: the API
+        # server starts a new thread per request, so connections can't be per thread
+        self.connection_pool_size = connection_pool_size
+        self._pool = queue.LifoQueue()
+        self._connections = []
+        self._connections_lock = threading.Lock()
         self.init_cache_db()
         
+        # Single-flight: product_hash -> in-progress LLM fetch that concurrent callers wait on
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._coalescing_stats = {'upstream_fetches': 0, 'coalesced': 0}
+        
+        # Multi-product prompts (get_nutrition_data_batch)
+        self._batch_stats = {'prompts': 0, 'items': 0, 'parsed': 0, 'retried_individually': 0}
+        self._batch_stats_lock = threading.Lock()
+        
         # Free LLM providers configuration
         self.providers = {
             "huggingface": {
@@ -27,14 +72,18 @@ class LLMNutritionService:
                 "headers": {"Authorization": f"Bearer {os.getenv('HUGGINGFACE_API_KEY', '')}"},
                 "timeout": 10,
                 "cost": 0.0,  # Free
-                "rate_limit": 1000  # requests per hour
+                "rate_limit_per_hour": 1000,
+                "expected_latency": 5.0  # seconds, prior until measured
             },
             "ollama_local": {
                 "url": "http://localhost:11434/api/generate",
                 "headers": {"Content-Type": "application/json"},
+                "model": "llama2",  # or "llama3.2:3b", "qwen2.5"
+                "keep_alive": DEFAULT_KEEP_ALIVE,
                 "timeout": 15,
                 "cost": 0.0,  # Free local model
-                "rate_limit": float('inf')
+                "rate_limit_per_minute": None,  # Unlimited
+                "expected_latency": 3.0
             },
             "groq": {
                 "url": "https://api.groq.com/openai/v1/chat/completions",
@@ -44,178 +93,321 @@ class LLMNutritionService:
                 },
                 "timeout": 5,  # Very fast
                 "cost": 0.0,  # Free tier
-                "rate_limit": 30  # requests per minute
+                "rate_limit_per_minute": 30,
+                "expected_latency": 1.0
             }
         }
         
+        # Request budgets per provider (thread-safe token buckets)
+        self.rate_limiters = {
+            provider: RateLimiter(config.get("rate_limit_per_minute"), config.get("rate_limit_per_hour"))
+            for provider, config in self.providers.items()
+        }
+        
         # Performance tracking
-        self.request_timestamps = {}
         self.provider_performance = {}
         self.target_response_time = 3.0  # seconds
         self.daily_cost = 0.0  # All providers are free, but keep for compatibility
         
+        # Hedged requests: if a provider hasn't answered within its usual latency
+        # (this percentile of its past response times, capped at target_response_time),
+        # start the next provider too and take whichever valid answer arrives first
+        self.hedge_requests = True
+        self.hedge_percentile = 0.9
+        self._provider_executor = ThreadPoolExecutor(
+            max_workers=len(self.providers) * 4, thread_name_prefix='llm-provider'
+        )
+        
+        # Live per-provider statistics (EWMA) used to order providers
+        self.ewma_alpha = 0.2
+        self.unavailable_error_rate = 0.9  # providers failing this often are treated as down
+        self._provider_stats = {
+            provider: {
+                'ewma_latency': config['expected_latency'],
+                'ewma_failure_latency': float(config['timeout']),
+                'error_rate': 0.0,
+                'requests': 0,
+                'failures': 0,
+                'early_stops': 0,  # streamed generations cut off once all fields were parsed
+                'model_reloads': 0,  # requests that had to load the model again (keep_alive expired)
+                'model_reload_seconds': 0.0
+            }
+            for provider, config in self.providers.items()
+        }
+        self._provider_stats_lock = threading.Lock()
+        self.model_load_seconds = None  # set by warm_up_ollama
+        self.model_reload_threshold = 0.5  # seconds; a model that is still loaded reports a few ms
+        # Model load time of the current thread's provider call, kept out of its latency sample
+        self._call_load_seconds = threading.local()
+        
+    def _open_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.cache_db_path, timeout=30,
+            check_same_thread=False, cached_statements=64
+        )
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-8000")  # 8 MB page cache
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+    
+    @contextmanager
+    def _connection(self):
+        """Check a cache connection out of the pool, opening one while under the limit"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._connections_lock:
+                if len(self._connections) < self.connection_pool_size:
+                    conn = self._open_connection()
+                    self._connections.append(conn)
+            if conn is None:
+                conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+    
+    def close(self):
+        """Close every cache connection opened by this service"""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+            self._pool = queue.LifoQueue()
+    
     def init_cache_db(self):
-        """Initialize SQLite cache database"""
-        conn = sqlite3.connect(self.cache_db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS nutrition_cache (
-                product_hash TEXT PRIMARY KEY,
-                product_name TEXT,
-                brand TEXT,
-                category TEXT,
-                nutrition_data TEXT,
-                confidence_score REAL,
-                created_at TEXT,
-                model_used TEXT
-            )
-        ''')
-        conn.commit()
-        conn.close()
+        """Initialize SQLite cache database (WAL mode so readers never block on writers)"""
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS nutrition_cache (
+                    product_hash TEXT PRIMARY KEY,
+                    product_name TEXT,
+                    brand TEXT,
+                    category TEXT,
+                    nutrition_data TEXT,
+                    confidence_score REAL,
+                    created_at TEXT,
+                    model_used TEXT
+                )
+            ''')
+            conn.commit()
         
     def get_product_hash(self, product_name: str, brand: str, category: str) -> str:
         """Generate unique hash for product identification"""
         key = f"{product_name.lower().strip()}|{brand.lower().strip()}|{category.lower().strip()}"
         return hashlib.md5(key.encode()).hexdigest()
     
+    def _memory_get(self, product_hash: str) -> Optional[Dict]:
+        """Parsed cache entry from the in-memory tier, or None"""
+        with self._memory_cache_lock:
+            entry = self._memory_cache.get(product_hash)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._memory_cache[product_hash]
+                self._memory_cache_stats['expired'] += 1
+                entry = None
+            if entry is None:
+                self._memory_cache_stats['misses'] += 1
+                return None
+            self._memory_cache.move_to_end(product_hash)
+            self._memory_cache_stats['hits'] += 1
+        
+        # Copy so callers can't modify the cached entry
+        result = entry[1]
+        return {**result, "nutrition_data": dict(result["nutrition_data"])}
+    
+    def _memory_put(self, product_hash: str, result: Dict):
+        """Store a parsed cache entry in the in-memory tier"""
+        if self.memory_cache_size <= 0:
+            return
+        with self._memory_cache_lock:
+            self._memory_cache[product_hash] = (time.monotonic() + self.memory_cache_ttl, result)
+            self._memory_cache.move_to_end(product_hash)
+            while len(self._memory_cache) > self.memory_cache_size:
+                self._memory_cache.popitem(last=False)
+                self._memory_cache_stats['evictions'] += 1
+    
+    def clear_memory_cache(self):
+        """Drop the in-memory tier (the SQLite cache is untouched)"""
+        with self._memory_cache_lock:
+            self._memory_cache.clear()
+    
     def check_cache(self, product_name: str, brand: str, category: str) -> Optional[Dict]:
-        """Check if nutrition data exists in cache"""
+        """Check if nutrition data exists in cache (memory first, then SQLite)"""
         product_hash = self.get_product_hash(product_name, brand, category)
         
-        conn = sqlite3.connect(self.cache_db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT nutrition_data, confidence_score, created_at FROM nutrition_cache WHERE product_hash = ?",
-            (product_hash,)
-        )
-        result = cursor.fetchone()
-        conn.close()
+        cached = self._memory_get(product_hash)
+        if cached:
+            return cached
+        
+        with self._connection() as conn:
+            result = conn.execute(self.CACHE_SELECT_SQL, (product_hash,)).fetchone()
         
         if result:
-            return {
+            cached = {
                 "nutrition_data": json.loads(result[0]),
                 "confidence_score": result[1],
                 "created_at": result[2],
                 "from_cache": True
             }
+            self._memory_put(product_hash, cached)
+            return {**cached, "nutrition_data": dict(cached["nutrition_data"])}
         return None
     
     def save_to_cache(self, product_name: str, brand: str, category: str, 
                      nutrition_data: Dict, confidence_score: float, model_used: str):
-        """Save nutrition data to cache"""
+        """Save nutrition data to cache (written through to the memory tier)"""
         product_hash = self.get_product_hash(product_name, brand, category)
+        created_at = datetime.now(timezone.utc).isoformat()
         
-        conn = sqlite3.connect(self.cache_db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO nutrition_cache 
-            (product_hash, product_name, brand, category, nutrition_data, confidence_score, created_at, model_used)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            product_hash, product_name, brand, category,
-            json.dumps(nutrition_data), confidence_score,
-            datetime.now(timezone.utc).isoformat(), model_used
-        ))
-        conn.commit()
-        conn.close()
-    
-    def can_make_request(self, provider: str) -> Tuple[bool, str]:
-        """Check if we can make a request to a specific provider"""
-        now = time.time()
-        
-        if provider not in self.request_timestamps:
-            self.request_timestamps[provider] = []
-        
-        # Clean old timestamps
-        if provider == "groq":
-            # Clean timestamps older than 1 minute
-            self.request_timestamps[provider] = [
-                ts for ts in self.request_timestamps[provider] if now - ts < 60
-            ]
-            if len(self.request_timestamps[provider]) >= self.providers[provider]["rate_limit"]:
-                return False, f"Rate limit exceeded for {provider}"
-        else:
-            # Clean timestamps older than 1 hour for other providers
-            self.request_timestamps[provider] = [
-                ts for ts in self.request_timestamps[provider] if now - ts < 3600
-            ]
-            if len(self.request_timestamps[provider]) >= self.providers[provider]["rate_limit"]:
-                return False, f"Rate limit exceeded for {provider}"
+        with self._connection() as conn, conn:
+            conn.execute(self.CACHE_INSERT_SQL, (
+                product_hash, product_name, brand, category,
+                json.dumps(nutrition_data), confidence_score,
+                created_at, model_used
+            ))
+        
+        # Round-trip through JSON so memory hits match what SQLite would return
+        self._memory_put(product_hash, {
+            "nutrition_data": json.loads(json.dumps(nutrition_data)),
+            "confidence_score": confidence_score,
+            "created_at": created_at,
+            "from_cache": True
+        })
+    
+    def clear_cache(self) -> int:
+        """Delete every cached entry (memory and SQLite); returns the number removed"""
+        with self._connection() as conn, conn:
+            deleted = conn.execute("DELETE FROM nutrition_cache").rowcount
+        self.clear_memory_cache()
+        return deleted
+    
+    def can_make_request(self, provider: str, timeout: float = 0) -> Tuple[bool, str]:
+        """
+        Reserve rate-limit capacity for one request to a provider
+        
+        Args:
+            provider: Provider name
+            timeout: Seconds to wait for capacity (0 returns immediately)
         
-        return True, "OK"
+        Returns:
+            (True, "OK") with the request counted, or (False, reason)
+        """
+        if self.rate_limiters[provider].acquire(timeout=timeout):
+            return True, "OK"
+        return False, f"Rate limit exceeded for {provider}"
     
-    def get_nutrition_from_groq(self, prompt: str) -> Optional[Dict]:
-        """Fast nutrition data from Groq (free tier, very fast)"""
+    def get_nutrition_from_groq(self, prompt: str, max_tokens: int = 300, parse=None,
+                                cancel: Optional[threading.Event] = None) -> Optional[Dict]:
+        """Fast nutrition data from Groq (free tier, very fast); a set cancel skips the request"""
         try:
+            if cancel is not None and cancel.is_set():
+                return None
+            
             payload = {
                 "model": "llama3-8b-8192",  # Fast, free model
                 "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 300,
+                "max_tokens": max_tokens,
                 "temperature": 0.3
             }
             
-            response = requests.post(
+            response = get_session().post(
                 self.providers["groq"]["url"],
                 headers=self.providers["groq"]["headers"],
                 json=payload,
                 timeout=self.providers["groq"]["timeout"]
             )
             
-            if response.status_code == 200:
+            if response.status_code == 200 and not (cancel is not None and cancel.is_set()):
                 content = response.json()["choices"][0]["message"]["content"]
-                return self.parse_nutrition_response(content, "groq-llama3")
+                return (parse or self.parse_nutrition_response)(content, "groq-llama3")
             
         except Exception as e:
             print(f"  -> Groq API error: {e}")
         return None
     
-    def get_nutrition_from_huggingface(self, prompt: str) -> Optional[Dict]:
-        """Nutrition data from HuggingFace free inference API"""
+    def get_nutrition_from_huggingface(self, prompt: str, parse=None,
+                                       cancel: Optional[threading.Event] = None) -> Optional[Dict]:
+        """Nutrition data from HuggingFace free inference API; a set cancel skips the request"""
         try:
+            if cancel is not None and cancel.is_set():
+                return None
+            
             # Use a nutrition-focused model if available
             payload = {"inputs": prompt}
             
-            response = requests.post(
+            response = get_session().post(
                 "https://api-inference.huggingface.co/models/microsoft/DialoGPT-medium",
                 headers=self.providers["huggingface"]["headers"],
                 json=payload,
                 timeout=self.providers["huggingface"]["timeout"]
             )
             
-            if response.status_code == 200:
+            if response.status_code == 200 and not (cancel is not None and cancel.is_set()):
                 result = response.json()
                 if isinstance(result, list) and len(result) > 0:
                     content = result[0].get("generated_text", "")
-                    return self.parse_nutrition_response(content, "huggingface")
+                    return (parse or self.parse_nutrition_response)(content, "huggingface")
             
         except Exception as e:
             print(f"  -> HuggingFace API error: {e}")
         return None
     
-    def get_nutrition_from_ollama(self, prompt: str) -> Optional[Dict]:
-        """Local Ollama model (if running)"""
+    def get_nutrition_from_ollama(self, prompt: str, parse=None, is_complete=has_fields,
+                                  cancel: Optional[threading.Event] = None) -> Optional[Dict]:
+        """Local Ollama model (if running); streams and stops once is_complete(text) or cancel is set"""
         try:
             payload = {
-                "model": "llama2",  # or "mistral", "codellama"
+                "model": self.providers["ollama_local"]["model"],
                 "prompt": prompt,
-                "stream": False
+                "keep_alive": self.providers["ollama_local"]["keep_alive"]
             }
             
-            response = requests.post(
+            content, stopped_early, load_seconds = stream_generate(
                 self.providers["ollama_local"]["url"],
+                payload,
+                is_complete=is_complete,
+                cancel=cancel,
                 headers=self.providers["ollama_local"]["headers"],
-                json=payload,
                 timeout=self.providers["ollama_local"]["timeout"]
             )
             
-            if response.status_code == 200:
-                content = response.json().get("response", "")
-                return self.parse_nutrition_response(content, "ollama-local")
+            if load_seconds:
+                self._call_load_seconds.value = load_seconds
+                if load_seconds >= self.model_reload_threshold:
+                    with self._provider_stats_lock:
+                        self._provider_stats["ollama_local"]["model_reloads"] += 1
+                        self._provider_stats["ollama_local"]["model_reload_seconds"] += load_seconds
+                    print(f"  -> Ollama reloaded the model ({load_seconds:.1f}s, not counted as latency)")
+            
+            if content is not None:
+                if stopped_early:
+                    with self._provider_stats_lock:
+                        self._provider_stats["ollama_local"]["early_stops"] += 1
+                return (parse or self.parse_nutrition_response)(content, "ollama-local")
             
         except Exception as e:
             print(f"  -> Ollama local error: {e}")
         return None
     
+    def warm_up_ollama(self) -> Dict:
+        """
+        Preload the local Ollama model with its keep_alive
+        
+        Keeps the model load out of the first request's latency (and out of
+        the provider's EWMA); the load time is reported separately in
+        get_provider_stats()
+        """
+        config = self.providers["ollama_local"]
+        result = warm_up(config["url"], config["model"], config["keep_alive"])
+        if result["loaded"]:
+            self.model_load_seconds = result["load_seconds"]
+            print(f"  -> Ollama model {config['model']} loaded in {result['load_seconds']:.1f}s")
+        else:
+            print(f"  -> Ollama warm-up failed: {result['error']}")
+        return result
+    
     def parse_nutrition_response(self, content: str, model_used: str) -> Optional[Dict]:
         """Parse field-value response format"""
         try:
@@ -318,8 +510,14 @@ class LLMNutritionService:
         return None
     
     def get_nutrition_from_llm(self, product_name: str, brand: str, category: str, 
-                              size_value: float = None, size_unit: str = None) -> Optional[Dict]:
-        """Fetch nutrition data using fastest available free LLM"""
+                              size_value: float = None, size_unit: str = None,
+                              wait_for_capacity: float = 0) -> Optional[Dict]:
+        """
+        Fetch nutrition data using fastest available free LLM
+        
+        wait_for_capacity is how long to wait for a rate-limited provider
+        before skipping it (batch jobs wait, interactive requests don't)
+        """
         
         size_info = f" ({size_value} {size_unit})" if size_value and size_unit else ""
         
@@ -333,35 +531,34 @@ Size: {size_value} {size_unit}
 
 TASK: Extract nutrition data for database integration. Provide field-value pairs for our Indian food database.
 
-DATA SOURCES (priority order):
+{self.nutrition_guidance(category)}
+
+Return ONLY the field-value pairs as shown above. No additional text."""
+        
+        result = self._fetch(lambda provider, cancel: self._call_provider(provider, prompt, cancel=cancel),
+                             wait_for_capacity)
+        
+        if result is None:
+            print(f"  -> All LLM providers failed for {product_name}")
+        return result
+    
+    def nutrition_guidance(self, category: Optional[str] = None) -> str:
+        """
+        Sources, fields, market focus and scoring shared by the single and batch prompts
+        
+        category is the single product's category; None words it for a batch
+        """
+        market_category = category if category is not None else "the product's category"
+        scoring_category = f"Indian {category}" if category is not None else "the Indian category"
+        
+        return f"""DATA SOURCES (priority order):
 1. Official brand websites (Nestle India, Britannia, Parle, ITC, etc.)
 2. FSSAI nutrition databases
 3. Indian Food Composition Tables (NIN-ICMR)  
 4. Verified Indian retailer nutrition labels
-5. Indian market standards for {category}
+5. Indian market standards for {market_category}
 
-REQUIRED FIELDS - Provide as field-value pairs:
-
-NUTRITION (per 100g/100ml):
-energy_kcal_per_100g: <number>
-carbs_g_per_100g: <number>
-total_sugars_g_per_100g: <number>
-protein_g_per_100g: <number>
-fat_g_per_100g: <number>
-saturated_fat_g_per_100g: <number>
-fiber_g_per_100g: <number>
-sodium_mg_per_100g: <number>
-salt_g_per_100g: <number>
-
-PRODUCT INFO:
-ingredients_list: ingredient1, ingredient2, ingredient3
-serving_size: 30g
-servings_per_container: 7
-
-QUALITY:
-confidence_score: 0.85
-data_source: Brand official website
-processing_notes: Verified from Indian nutrition label
+{nutrition_fields_template(for_each=category is None)}
 
 INDIAN MARKET FOCUS:
 - Use Indian formulations (not international variants)
@@ -374,53 +571,256 @@ CONFIDENCE SCORING:
 0.9-1.0: Official brand/FSSAI data
 0.8-0.9: Government nutrition database  
 0.7-0.8: Verified retailer label
-0.6-0.7: Industry standard for Indian {category}
+0.6-0.7: Industry standard for {scoring_category}"""
+    
+    def create_batch_nutrition_prompt(self, products: List[Dict]) -> str:
+        """One prompt asking for nutrition data of several products, answered per product marker"""
+        products_block = format_products_block(products, [
+            ("Product", "product_name"), ("Brand", "brand"), ("Category", "category"),
+            ("Size value", "size_value"), ("Size unit", "size_unit")
+        ])
+        
+        return f"""INDIAN FOOD NUTRITION DATA EXTRACTION - {len(products)} PRODUCTS
 
-Return ONLY the field-value pairs as shown above. No additional text."""
+{products_block}
+
+TASK: Extract nutrition data for each product above for database integration. Provide field-value pairs for our Indian food database.
+
+{self.nutrition_guidance()}
+
+{batch_output_instructions(len(products))}"""
+    
+    def parse_batch_response(self, content: str, count: int, model_used: str) -> Optional[List[Optional[Dict]]]:
+        """
+        Parse a multi-product response into per-product results by index
         
-        # Try providers in order of speed (fastest first)
-        providers_by_speed = ["groq", "ollama_local", "huggingface"]
+        Products whose section is missing or has no nutrition values are
+        None; returns None if no product could be parsed at all
+        """
+        results = []
+        for section in split_batch_response(content, count):
+            result = self.parse_nutrition_response(section, model_used) if section else None
+            if result and not any(v is not None for k, v in result["nutrition_data"].items()
+                                  if k.endswith("_per_100g")):
+                result = None
+            results.append(result)
+        
+        return results if any(results) else None
+    
+    def get_nutrition_batch_from_llm(self, products: List[Dict],
+                                     wait_for_capacity: float = 0) -> List[Optional[Dict]]:
+        """Fetch nutrition data for several products with one LLM request"""
+        prompt = self.create_batch_nutrition_prompt(products)
+        count = len(products)
+        
+        def call(provider, cancel):
+            return self._call_provider(
+                provider, prompt,
+                parse=lambda content, model_used: self.parse_batch_response(content, count, model_used),
+                max_tokens=300 * count,
+                is_complete=lambda text: batch_has_fields(text, count),
+                cancel=cancel
+            )
+        
+        results = self._fetch(call, wait_for_capacity)
+        return results if results else [None] * count
+    
+    def _call_provider(self, provider: str, prompt: str, parse=None, max_tokens: int = 300,
+                       is_complete=has_fields, cancel: Optional[threading.Event] = None):
+        """
+        Query one provider and record its request and response time
+        
+        Setting cancel (a hedge that lost) stops the call early; a cancelled
+        call is not counted as a provider failure. Model load time reported
+        by the provider is left out of the response time
+        """
+        start_time = time.time()
+        result = None
+        self._call_load_seconds.value = 0.0
         
-        for provider in providers_by_speed:
-            can_request, reason = self.can_make_request(provider)
+        try:
+            if provider == "groq":
+                result = self.get_nutrition_from_groq(prompt, max_tokens=max_tokens, parse=parse, cancel=cancel)
+            elif provider == "ollama_local":
+                result = self.get_nutrition_from_ollama(prompt, parse=parse, is_complete=is_complete, cancel=cancel)
+            elif provider == "huggingface":
+                result = self.get_nutrition_from_huggingface(prompt, parse=parse, cancel=cancel)
+        except Exception as e:
+            print(f"  -> {provider} failed: {e}")
+        
+        response_time = max(time.time() - start_time - self._call_load_seconds.value, 0.0)
+        if cancel is not None and cancel.is_set() and not result:
+            return None
+        self._record_provider_result(provider, response_time, bool(result))
+        
+        if result:
+            print(f"  -> Got nutrition data from {provider} in {response_time:.2f}s")
+            
+            # Track performance
+            self.provider_performance.setdefault(provider, []).append(response_time)
+        
+        return result
+    
+    def _record_provider_result(self, provider: str, response_time: float, success: bool):
+        """Fold one request outcome into the provider's EWMA statistics"""
+        alpha = self.ewma_alpha
+        with self._provider_stats_lock:
+            stats = self._provider_stats[provider]
+            stats['requests'] += 1
+            stats['error_rate'] = (1 - alpha) * stats['error_rate'] + alpha * (0.0 if success else 1.0)
+            if success:
+                stats['ewma_latency'] = (1 - alpha) * stats['ewma_latency'] + alpha * response_time
+            else:
+                stats['failures'] += 1
+                stats['ewma_failure_latency'] = (1 - alpha) * stats['ewma_failure_latency'] + alpha * response_time
+    
+    def rate_limit_remaining(self, provider: str) -> Tuple[float, float]:
+        """(requests that can go through now, seconds until the next one can if none)"""
+        limiter = self.rate_limiters[provider]
+        return limiter.remaining(), limiter.time_until_available()
+    
+    def serving_providers(self) -> List[str]:
+        """Providers that are still answering (error rate below unavailable_error_rate)"""
+        with self._provider_stats_lock:
+            return [provider for provider, stats in self._provider_stats.items()
+                    if stats['error_rate'] < self.unavailable_error_rate]
+    
+    def expected_completion_time(self, provider: str) -> float:
+        """
+        Expected seconds until this provider returns a valid answer: its
+        success latency plus, per failure, the failure latency (geometric
+        in the error rate), plus any wait for rate-limit capacity
+        """
+        with self._provider_stats_lock:
+            stats = dict(self._provider_stats[provider])
+        
+        error_rate = min(stats['error_rate'], 0.95)
+        retries = error_rate / (1 - error_rate)
+        _, capacity_wait = self.rate_limit_remaining(provider)
+        return capacity_wait + stats['ewma_latency'] + retries * stats['ewma_failure_latency']
+    
+    def provider_order(self) -> List[str]:
+        """Providers sorted by expected completion time (fastest first)"""
+        return sorted(self.providers, key=self.expected_completion_time)
+    
+    def get_provider_stats(self) -> Dict:
+        """Live latency, error rate and rate-limit budget per provider"""
+        provider_stats = {}
+        for provider in self.provider_order():
+            with self._provider_stats_lock:
+                stats = dict(self._provider_stats[provider])
+            remaining, capacity_wait = self.rate_limit_remaining(provider)
+            provider_stats[provider] = {
+                'ewma_latency_seconds': round(stats['ewma_latency'], 3),
+                'ewma_failure_latency_seconds': round(stats['ewma_failure_latency'], 3),
+                'error_rate': round(stats['error_rate'], 3),
+                'requests': stats['requests'],
+                'failures': stats['failures'],
+                'early_stops': stats['early_stops'],
+                'model_load_seconds': self.model_load_seconds if provider == "ollama_local" else None,
+                'model_reloads': stats['model_reloads'],
+                'model_reload_seconds': round(stats['model_reload_seconds'], 2),
+                'rate_limit_remaining': remaining if remaining != float('inf') else None,
+                'rate_limit_reset_seconds': round(capacity_wait, 1),
+                'expected_completion_seconds': round(self.expected_completion_time(provider), 3)
+            }
+        return provider_stats
+    
+    def _fetch(self, call, wait_for_capacity: float = 0):
+        """
+        Run call(provider, cancel) over providers by expected completion time (fastest first)
+        
+        cancel is a threading.Event set once the call's result is no longer needed
+        """
+        providers_by_speed = self.provider_order()
+        
+        if self.hedge_requests:
+            return self._fetch_hedged(providers_by_speed, call, wait_for_capacity)
+        return self._fetch_sequential(providers_by_speed, call, wait_for_capacity)
+    
+    def _fetch_sequential(self, providers: List[str], call, wait_for_capacity: float = 0):
+        """Try providers one after another until one answers"""
+        for provider in providers:
+            can_request, reason = self.can_make_request(provider, wait_for_capacity)
             if not can_request:
                 continue
             
-            start_time = time.time()
-            result = None
+            result = call(provider, None)
+            if result:
+                return result
+        return None
+    
+    def hedge_delay(self, provider: str) -> float:
+        """Seconds to wait on a provider before also starting the next one"""
+        history = self.provider_performance.get(provider)
+        if not history:
+            return self.target_response_time
+        
+        recent = sorted(history[-100:])
+        percentile = recent[min(int(len(recent) * self.hedge_percentile), len(recent) - 1)]
+        return min(percentile, self.target_response_time)
+    
+    def _fetch_hedged(self, providers: List[str], call, wait_for_capacity: float = 0):
+        """
+        Start the first provider and hedge with the next one whenever the
+        current ones exceed their latency budget or fail; the first valid
+        result wins and the remaining requests are abandoned
+        """
+        remaining = list(providers)
+        pending = {}
+        cancel = threading.Event()
+        capacity_deadline = time.monotonic() + wait_for_capacity
+        
+        def start(provider: str) -> str:
+            remaining.remove(provider)
+            pending[self._provider_executor.submit(call, provider, cancel)] = provider
+            return provider
+        
+        def launch_next() -> Optional[str]:
+            # Hedges only take capacity that is free now; providers without it stay in line
+            for provider in list(remaining):
+                if self.can_make_request(provider)[0]:
+                    return start(provider)
             
-            try:
-                if provider == "groq":
-                    result = self.get_nutrition_from_groq(prompt)
-                elif provider == "ollama_local":
-                    result = self.get_nutrition_from_ollama(prompt)
-                elif provider == "huggingface":
-                    result = self.get_nutrition_from_huggingface(prompt)
+            # With nothing running, wait (up to wait_for_capacity) for the first provider to free up
+            if remaining and not pending:
+                provider = min(remaining, key=lambda p: self.rate_limiters[p].time_until_available())
+                if self.can_make_request(provider, max(0.0, capacity_deadline - time.monotonic()))[0]:
+                    return start(provider)
+            return None
+        
+        current = launch_next()
+        try:
+            while pending:
+                # Wait for an answer, but only up to the latest provider's budget while more can be started
+                timeout = self.hedge_delay(current) if remaining else None
+                done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
                 
-                # Track request
-                self.request_timestamps[provider].append(time.time())
+                for future in done:
+                    provider = pending.pop(future)
+                    result = future.result()
+                    if result:
+                        if len(pending) > 0:
+                            print(f"  -> {provider} won hedged request over {', '.join(pending.values())}")
+                        return result
                 
-                if result:
-                    response_time = time.time() - start_time
-                    print(f"  -> Got nutrition data from {provider} in {response_time:.2f}s")
-                    
-                    # Track performance
-                    if provider not in self.provider_performance:
-                        self.provider_performance[provider] = []
-                    self.provider_performance[provider].append(response_time)
-                    
-                    return result
-                    
-            except Exception as e:
-                print(f"  -> {provider} failed: {e}")
-                continue
-        
-        print(f"  -> All LLM providers failed for {product_name}")
-        return None
+                if remaining:
+                    launched = launch_next()
+                    if launched:
+                        if not done:
+                            print(f"  -> {current} slower than {timeout:.2f}s, hedging with {launched}")
+                        current = launched
+            return None
+        finally:
+            # Tell calls still running to stop (Ollama hangs up, dropping the generation);
+            # ones not started yet are cancelled outright
+            cancel.set()
+            for future in pending:
+                future.cancel()
     
     def get_nutrition_data(self, product_name: str, brand: str, category: str,
                           size_value: float = None, size_unit: str = None,
-                          force_refresh: bool = False) -> Optional[Dict]:
+                          force_refresh: bool = False, wait_for_capacity: float = 0) -> Optional[Dict]:
         """
         Get nutrition data with cache-first approach
         """
@@ -431,26 +831,129 @@ Return ONLY the field-value pairs as shown above. No additional text."""
                 print(f"  -> Using cached nutrition data for {product_name}")
                 return cached_result
         
-        # Fetch from LLM
-        print(f"  -> Fetching nutrition data from LLM for {product_name}")
-        llm_result = self.get_nutrition_from_llm(product_name, brand, category, size_value, size_unit)
-        
-        if llm_result:
-            # Save to cache
-            self.save_to_cache(
-                product_name, brand, category,
-                llm_result["nutrition_data"],
-                llm_result["confidence_score"],
-                llm_result["model_used"]
+        # Fetch from LLM, sharing one upstream request among concurrent callers
+        product_hash = self.get_product_hash(product_name, brand, category)
+        with self._inflight_lock:
+            flight = self._inflight.get(product_hash)
+            leader = flight is None
+            if leader:
+                flight = {'done': threading.Event(), 'result': None}
+                self._inflight[product_hash] = flight
+                self._coalescing_stats['upstream_fetches'] += 1
+            else:
+                self._coalescing_stats['coalesced'] += 1
+        
+        if not leader:
+            print(f"  -> Waiting on in-flight LLM request for {product_name}")
+            flight['done'].wait()
+            result = flight['result']
+            return {**result, "nutrition_data": dict(result["nutrition_data"])} if result else None
+        
+        try:
+            # A fetch that finished just before we registered may already be cached
+            llm_result = None if force_refresh else self.check_cache(product_name, brand, category)
+            if llm_result:
+                print(f"  -> Using cached nutrition data for {product_name}")
+            else:
+                print(f"  -> Fetching nutrition data from LLM for {product_name}")
+                llm_result = self.get_nutrition_from_llm(
+                    product_name, brand, category, size_value, size_unit, wait_for_capacity
+                )
+                
+                if llm_result:
+                    # Save to cache
+                    self.save_to_cache(
+                        product_name, brand, category,
+                        llm_result["nutrition_data"],
+                        llm_result["confidence_score"],
+                        llm_result["model_used"]
+                    )
+            
+            flight['result'] = llm_result
+            return llm_result
+        finally:
+            with self._inflight_lock:
+                del self._inflight[product_hash]
+            flight['done'].set()
+    
+    def get_nutrition_data_batch(self, products: List[Dict], products_per_prompt: int = 5,
+                                 force_refresh: bool = False,
+                                 wait_for_capacity: float = 0) -> List[Optional[Dict]]:
+        """
+        Get nutrition data for many products, packing uncached ones into
+        multi-product prompts
+        
+        Args:
+            products: Dicts with product_name, brand, category (size_value, size_unit optional)
+            products_per_prompt: Products per LLM request
+            force_refresh: Skip the cache lookup
+            wait_for_capacity: Seconds to wait for a rate-limited provider
+        
+        Returns:
+            Results in the same order as products (None where nothing was found)
+        """
+        results = [None] * len(products)
+        
+        uncached = []
+        for i, product in enumerate(products):
+            cached = None if force_refresh else self.check_cache(
+                product["product_name"], product["brand"], product["category"]
             )
+            if cached:
+                results[i] = cached
+            else:
+                uncached.append(i)
+        
+        for start in range(0, len(uncached), products_per_prompt):
+            group = uncached[start:start + products_per_prompt]
+            batch_results = [None] * len(group)
+            
+            if len(group) > 1:
+                print(f"  -> Fetching nutrition data for {len(group)} products in one LLM request")
+                batch_results = self.get_nutrition_batch_from_llm(
+                    [products[i] for i in group], wait_for_capacity
+                )
+                with self._batch_stats_lock:
+                    self._batch_stats['prompts'] += 1
+                    self._batch_stats['items'] += len(group)
+                    self._batch_stats['parsed'] += sum(1 for r in batch_results if r)
             
-        return llm_result
+            for i, result in zip(group, batch_results):
+                product = products[i]
+                if result:
+                    self.save_to_cache(
+                        product["product_name"], product["brand"], product["category"],
+                        result["nutrition_data"], result["confidence_score"], result["model_used"]
+                    )
+                else:
+                    # Unparsed item (or a group of one): fetch it on its own
+                    if len(group) > 1:
+                        with self._batch_stats_lock:
+                            self._batch_stats['retried_individually'] += 1
+                    result = self.get_nutrition_data(
+                        product["product_name"], product["brand"], product["category"],
+                        product.get("size_value"), product.get("size_unit"),
+                        force_refresh=force_refresh, wait_for_capacity=wait_for_capacity
+                    )
+                results[i] = result
+        
+        return results
     
     def process_products_batch(self, products_df: pd.DataFrame, 
                               batch_size: int = 10, 
-                              min_confidence: float = 0.3) -> pd.DataFrame:
+                              min_confidence: float = 0.3,
+                              wait_for_capacity: float = 120,
+                              products_per_prompt: int = 1,
+                              max_workers: int = 4) -> pd.DataFrame:
         """
-        Process multiple products in batches with smart filtering
+        Process multiple products concurrently with smart filtering
+        
+        Up to max_workers requests run at once; pacing comes from the
+        per-provider rate limiters, which workers wait on (up to
+        wait_for_capacity seconds) rather than skipping providers.
+        products_per_prompt > 1 packs that many products into each LLM
+        request. Progress is reported every batch_size products and results
+        are written back to products_df in one pass at the end.
         """
         print(f"Processing {len(products_df)} products for nutrition enhancement...")
         
@@ -466,75 +969,138 @@ Return ONLY the field-value pairs as shown above. No additional text."""
         if needs_nutrition.empty:
             return products_df
         
-        # Process in batches
+        # One task per LLM request
+        records = needs_nutrition[['product_name', 'brand', 'category', 'size_value', 'size_unit']
+                                  if 'size_value' in needs_nutrition.columns
+                                  else ['product_name', 'brand', 'category']].to_dict('records')
+        indices = list(needs_nutrition.index)
+        tasks = [
+            (indices[i:i + products_per_prompt], records[i:i + products_per_prompt])
+            for i in range(0, len(records), products_per_prompt)
+        ]
+        
+        results = {}
         processed_count = 0
-        enhanced_count = 0
+        next_report = batch_size
+        stopped_reason = None
+        start_time = time.time()
         
-        for i in range(0, len(needs_nutrition), batch_size):
-            batch = needs_nutrition.iloc[i:i+batch_size]
-            print(f"\nProcessing batch {i//batch_size + 1} ({len(batch)} products)...")
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='nutrition-batch') as executor:
+            pending = {}
+            task_iter = iter(tasks)
             
-            for idx, row in batch.iterrows():
-                result = self.get_nutrition_data(
-                    row['product_name'], 
-                    row['brand'], 
-                    row['category'],
-                    row.get('size_value'),
-                    row.get('size_unit')
-                )
-                
-                if result and result.get('confidence_score', 0) >= min_confidence:
-                    # Update the main dataframe
-                    products_df.at[idx, 'nutrition_data'] = json.dumps(result['nutrition_data'])
-                    products_df.at[idx, 'llm_fallback_used'] = True
-                    products_df.at[idx, 'data_quality_score'] = min(
-                        products_df.at[idx, 'data_quality_score'] + 15,  # Boost for nutrition data
-                        100
+            while True:
+                # Keep the pool busy without queueing the whole backlog up front
+                while len(pending) < max_workers * 2 and stopped_reason is None:
+                    task = next(task_iter, None)
+                    if task is None:
+                        break
+                    
+                    # Only providers still answering count: an unlimited local model that
+                    # isn't running would otherwise always report capacity
+                    next_capacity = min((self.rate_limiters[provider].time_until_available()
+                                         for provider in self.serving_providers()), default=float('inf'))
+                    if next_capacity > wait_for_capacity:
+                        stopped_reason = (f"all providers rate limited for {next_capacity:.0f}s"
+                                          if next_capacity != float('inf') else "no provider is answering")
+                        break
+                    
+                    future = executor.submit(
+                        self.get_nutrition_data_batch, task[1],
+                        products_per_prompt=products_per_prompt, wait_for_capacity=wait_for_capacity
                     )
-                    enhanced_count += 1
+                    pending[future] = task[0]
                 
-                processed_count += 1
+                if not pending:
+                    break
                 
-                # Add delay between requests to be respectful
-                time.sleep(1)
-            
-            print(f"  -> Batch complete. Enhanced {enhanced_count}/{processed_count} products so far")
-            
-            # Check if we should continue
-            can_continue, reason = self.can_make_request()
-            if not can_continue:
-                print(f"  -> Stopping batch processing: {reason}")
-                break
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    task_indices = pending.pop(future)
+                    try:
+                        task_results = future.result()
+                    except Exception as e:
+                        print(f"  -> Request failed: {e}")
+                        task_results = [None] * len(task_indices)
+                    results.update(zip(task_indices, task_results))
+                    processed_count += len(task_indices)
+                
+                if processed_count >= next_report:
+                    elapsed = time.time() - start_time
+                    enhanced_so_far = sum(1 for r in results.values()
+                                          if r and r.get('confidence_score', 0) >= min_confidence)
+                    print(f"  -> Enhanced {enhanced_so_far}/{processed_count} products so far "
+                          f"({processed_count / elapsed * 60 if elapsed > 0 else 0:.1f} products/min)")
+                    next_report = (processed_count // batch_size + 1) * batch_size
+        
+        if stopped_reason:
+            print(f"  -> Stopping batch processing: {stopped_reason}")
+        
+        # Bulk write-back of accepted results
+        accepted = {
+            idx: result for idx, result in results.items()
+            if result and result.get('confidence_score', 0) >= min_confidence
+        }
+        enhanced_count = len(accepted)
+        if accepted:
+            accepted_index = pd.Index(list(accepted))
+            products_df.loc[accepted_index, 'nutrition_data'] = [
+                json.dumps(result['nutrition_data']) for result in accepted.values()
+            ]
+            products_df.loc[accepted_index, 'llm_fallback_used'] = True
+            products_df.loc[accepted_index, 'data_quality_score'] = (
+                products_df.loc[accepted_index, 'data_quality_score'] + 15  # Boost for nutrition data
+            ).clip(upper=100)
+        
+        elapsed = time.time() - start_time
+        from_cache = sum(1 for r in results.values() if r and r.get('from_cache'))
         
         print(f"\nLLM Enhancement complete:")
-        print(f"  -> Processed: {processed_count} products")
-        print(f"  -> Enhanced: {enhanced_count} products")
+        print(f"  -> Processed: {processed_count} products in {elapsed:.1f}s")
+        print(f"  -> Enhanced: {enhanced_count} products ({from_cache} from cache)")
+        print(f"  -> Throughput: {processed_count / elapsed * 60 if elapsed > 0 else 0:.1f} products/min "
+              f"with {max_workers} workers")
         print(f"  -> Daily cost: ${self.daily_cost:.3f}")
         
         return products_df
     
     def get_cache_stats(self) -> Dict:
         """Get cache statistics"""
-        conn = sqlite3.connect(self.cache_db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT COUNT(*) FROM nutrition_cache")
-        total_cached = cursor.fetchone()[0]
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT COUNT(*) FROM nutrition_cache")
+            total_cached = cursor.fetchone()[0]
+            
+            cursor.execute("SELECT AVG(confidence_score) FROM nutrition_cache")
+            avg_confidence = cursor.fetchone()[0] or 0
+            
+            cursor.execute("SELECT model_used, COUNT(*) FROM nutrition_cache GROUP BY model_used")
+            model_stats = dict(cursor.fetchall())
+            cursor.close()
         
-        cursor.execute("SELECT AVG(confidence_score) FROM nutrition_cache")
-        avg_confidence = cursor.fetchone()[0] or 0
+        with self._memory_cache_lock:
+            memory_stats = dict(self._memory_cache_stats, entries=len(self._memory_cache),
+                                capacity=self.memory_cache_size, ttl_seconds=self.memory_cache_ttl)
+        lookups = memory_stats['hits'] + memory_stats['misses']
+        memory_stats['hit_rate'] = memory_stats['hits'] / lookups if lookups else 0.0
         
-        cursor.execute("SELECT model_used, COUNT(*) FROM nutrition_cache GROUP BY model_used")
-        model_stats = dict(cursor.fetchall())
+        with self._inflight_lock:
+            coalescing_stats = dict(self._coalescing_stats, in_flight=len(self._inflight))
         
-        conn.close()
+        with self._batch_stats_lock:
+            batch_stats = dict(self._batch_stats)
         
         return {
             "total_cached": total_cached,
             "average_confidence": avg_confidence,
             "model_breakdown": model_stats,
             "daily_cost": self.daily_cost,
-            "requests_this_minute": len(self.request_timestamps)
+            "rate_limits": {provider: limiter.get_stats() for provider, limiter in self.rate_limiters.items()},
+            "memory_cache": memory_stats,
+            "request_coalescing": coalescing_stats,
+            "prompt_batching": batch_stats,
+            "providers": self.get_provider_stats()
         }
 
 
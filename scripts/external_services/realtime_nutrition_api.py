@@ -10,7 +10,6 @@ import time
 from llm_nutrition_service import LLMNutritionService
 import threading
 from concurrent.futures import ThreadPoolExecutor
-import sqlite3
 from datetime import datetime, timezone
 
 app = Flask(__name__)
@@ -28,7 +27,7 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now(timezone.utc).isoformat(),
-        "cache_stats": llm_service.get_cache_stats()
+        "cache_stats": llm_service.get_cache_stats()  # includes per-provider stats
     })
 
 @app.route('/nutrition', methods=['POST'])
@@ -194,12 +193,7 @@ def clear_cache():
     """Clear nutrition cache (admin endpoint)"""
     try:
         # Clear the cache database
-        conn = sqlite3.connect(llm_service.cache_db_path)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM nutrition_cache")
-        deleted_count = cursor.rowcount
-        conn.commit()
-        conn.close()
+        deleted_count = llm_service.clear_cache()
         
         return jsonify({
             "success": True,
@@ -215,6 +209,7 @@ def clear_cache():
 
 if __name__ == '__main__':
     print("🚀 Starting Real-time Nutrition API Server...")
+    print("🔥 Warming up local Ollama model:", llm_service.warm_up_ollama())
     print("📊 Cache stats:", llm_service.get_cache_stats())
     print("🔗 Available endpoints:")
     print("   POST /nutrition - Get nutrition for single product")
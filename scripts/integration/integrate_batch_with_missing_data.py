@@ -8,11 +8,11 @@ import pandas as pd
 import sys
 import os
 import json
-from datetime import datetime
 
 # Add parent directories to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
-from csv_handler import load_products_csv, save_products_csv, get_category_stats
+from csv_handler import load_products_csv, save_products_csv, get_category_stats, ProductCatalog
+from catalog_backup import create_backup
 
 def integrate_batch_with_missing_data(csv_file, min_confidence=0.6, skip_quality_check=False):
     """
@@ -93,17 +93,16 @@ def integrate_batch_with_missing_data(csv_file, min_confidence=0.6, skip_quality
     
     # Load main database
     df_main = load_products_csv()
-    current_stats = get_category_stats()
+    catalog = ProductCatalog(df_main)
+    current_stats = get_category_stats(df=df_main)
     
     print(f"\n📊 Current Database Status:")
     for category, stats in current_stats.items():
         print(f"   Enhanced {category}: {stats['enhanced']}/{stats['total']} ({stats['enhancement_rate']:.1f}%)")
     
     # Create backup
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = f"data/products_backup_batch2_{timestamp}.csv"
-    save_products_csv(df_main, backup_file)
-    print(f"💾 Backup created: {backup_file}")
+    snapshot_id = create_backup('data/products.csv', label=f"batch_integration_{os.path.basename(csv_file)}")
+    print(f"💾 Backup created: snapshot {snapshot_id}")
     
     # Integration process
     integration_stats = {
@@ -121,19 +120,17 @@ def integrate_batch_with_missing_data(csv_file, min_confidence=0.6, skip_quality
     for _, row in df_batch.iterrows():
         integration_stats['processed'] += 1
         
-        # Find product in main database
+        # Find product in main database (indexed by id)
         product_id = row.get('product_id', row.get('original_product_id'))
-        product_matches = df_main[df_main['id'] == product_id]
+        product = catalog.get(product_id)
         
-        if len(product_matches) == 0:
+        if product is None:
             integration_stats['skipped_not_found'] += 1
             print(f"⏭️  Product not found: {product_id}")
             continue
         
-        product_idx = product_matches.index[0]
-        
         # Check if already enhanced
-        if df_main.at[product_idx, 'llm_fallback_used'] == True:
+        if product['llm_fallback_used'] == True:
             integration_stats['skipped_already_enhanced'] += 1
             print(f"⏭️  Already enhanced: {row['product_name'][:40]}")
             continue
@@ -189,21 +186,23 @@ def integrate_batch_with_missing_data(csv_file, min_confidence=0.6, skip_quality
                 }
             }
             
-            # Update main database
-            df_main.at[product_idx, 'llm_fallback_used'] = True
-            df_main.at[product_idx, 'ingredients'] = json.dumps(ingredients_data)
-            df_main.at[product_idx, 'nutrition_data'] = json.dumps(nutrition_data)
-            df_main.at[product_idx, 'llm_confidence'] = float(confidence)
-            df_main.at[product_idx, 'llm_provider'] = 'external_llm_batch2'
-            df_main.at[product_idx, 'llm_response_time'] = 0
-            
             # Quality score boost
             confidence_boost = int(float(confidence) * 25)
             source_boost = 5 if 'official' in str(row.get('data_source', '')).lower() else 0
             
-            current_score = int(df_main.at[product_idx, 'data_quality_score'] or 90)
+            current_score = int(product['data_quality_score'] or 90)
             new_score = min(100, current_score + confidence_boost + source_boost)
-            df_main.at[product_idx, 'data_quality_score'] = new_score
+            
+            # Update main database
+            catalog.update(product_id, {
+                'llm_fallback_used': True,
+                'ingredients': json.dumps(ingredients_data),
+                'nutrition_data': json.dumps(nutrition_data),
+                'llm_confidence': float(confidence),
+                'llm_provider': 'external_llm_batch2',
+                'llm_response_time': 0,
+                'data_quality_score': new_score
+            })
             
             integration_stats['integrated'] += 1
             integration_stats['total_confidence'] += float(confidence)
@@ -218,7 +217,7 @@ def integrate_batch_with_missing_data(csv_file, min_confidence=0.6, skip_quality
     save_products_csv(df_main)
     
     # Results summary
-    final_stats = get_category_stats()
+    final_stats = get_category_stats(df=df_main)
     avg_confidence = integration_stats['total_confidence'] / integration_stats['integrated'] if integration_stats['integrated'] > 0 else 0
     
     # Calculate total improvement across all categories
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Benchmark csv_handler read/write paths on a synthetic products catalog
+Compares the current save_products_csv against the legacy iterrows writer
+and cold CSV parsing against the columnar sidecar cache, and reports the
+memory saved by compact dtypes
+"""
+
+import os
+import sys
+import time
+import filecmp
+import tempfile
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Add parent directories to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
+from csv_handler import (save_products_csv, load_products_csv, sidecar_path, feather,
+                         compact_products_frame, clear_frame_cache)
+
+def make_synthetic_catalog(rows):
+    """Build a products-shaped DataFrame with realistic column contents"""
+    rng = np.random.default_rng(42)
+    categories = np.array(['beverage', 'snacks', 'dairy', 'biscuits', 'chocolate', 'breakfast'])
+    sources = np.array(['starquik', 'jiomart', 'frugivore'])
+    units = np.array(['g', 'ml', 'kg', 'L', 'pcs'])
+    nutrition = ('{"energy_kcal": null, "fat_g": null, "saturated_fat_g": null, "carbs_g": null, '
+                 '"sugars_g": null, "protein_g": null, "salt_g": null, "fiber_g": null, "sodium_mg": null}')
+    ids = [f'synthetic_product_{i}' for i in range(rows)]
+
+    df = pd.DataFrame({
+        'id': ids,
+        'product_name': [f'Synthetic Product {i} 400 Gm' for i in range(rows)],
+        'brand': [f'Brand {i % 500}' for i in range(rows)],
+        'category': categories[rng.integers(0, len(categories), rows)],
+        'subcategory': 'general',
+        'size_value': rng.integers(1, 1000, rows).astype(float),
+        'size_unit': units[rng.integers(0, len(units), rows)],
+        'price': np.round(rng.random(rows) * 500, 2),
+        'source': sources[rng.integers(0, len(sources), rows)],
+        'source_url': 'https://www.starquik.com/collections/curd-yougurt',
+        'ingredients': '',
+        'nutrition_data': nutrition,
+        'image_url': '',
+        'last_updated': '2025-10-15T06:18:30.839507+00:00',
+        'search_count': 0.0,
+        'llm_fallback_used': rng.random(rows) < 0.1,
+        'data_quality_score': 90.0,
+    })
+
+    # Sprinkle in missing values like a real catalog
+    df.loc[rng.random(rows) < 0.05, 'price'] = np.nan
+    return df
+
+def legacy_save_products_csv(df, file_path):
+    """The original row-by-row writer, kept here as the baseline"""
+    df_copy = df.copy()
+
+    if 'llm_fallback_used' in df_copy.columns:
+        df_copy['llm_fallback_used'] = df_copy['llm_fallback_used'].astype(str)
+
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write('||'.join(df_copy.columns) + '\n')
+
+        for _, row in df_copy.iterrows():
+            row_data = []
+            for col in df_copy.columns:
+                value = str(row[col]) if pd.notna(row[col]) else ''
+                row_data.append(value)
+            f.write('||'.join(row_data) + '\n')
+
+def time_call(func, *args, **kwargs):
+    """Run func once and return elapsed seconds"""
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+def benchmark_save(rows):
+    """Time legacy vs vectorized save and check the outputs are identical"""
+    print(f"💾 SAVE BENCHMARK ({rows:,} rows)")
+    print("=" * 50)
+
+    df = make_synthetic_catalog(rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy_path = os.path.join(tmp_dir, 'legacy.csv')
+        current_path = os.path.join(tmp_dir, 'current.csv')
+
+        legacy_time = time_call(legacy_save_products_csv, df, legacy_path)
+        current_time = time_call(save_products_csv, df, current_path)
+        identical = filecmp.cmp(legacy_path, current_path, shallow=False)
+        size_mb = os.path.getsize(current_path) / (1024 * 1024)
+
+    print(f"   File size: {size_mb:.1f} MB")
+    print(f"   Legacy (iterrows): {legacy_time:.2f}s")
+    print(f"   Vectorized:        {current_time:.2f}s")
+    print(f"   Speedup:           {legacy_time / current_time:.1f}x")
+    print(f"   {'✅' if identical else '❌'} Byte-identical output: {identical}")
+
+    return identical
+
+def benchmark_load(rows):
+    """Time a cold CSV parse against loads served from the sidecar and frame caches"""
+    print(f"\n📥 LOAD BENCHMARK ({rows:,} rows)")
+    print("=" * 50)
+
+    if feather is None:
+        print("   ⚠️ pyarrow not installed - sidecar cache disabled, skipping")
+        return True
+
+    df = make_synthetic_catalog(rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, 'products.csv')
+        save_products_csv(df, csv_path)
+
+        parse_time = time_call(load_products_csv, csv_path, use_cache=False)
+        clear_frame_cache()
+        miss_time = time_call(load_products_csv, csv_path)
+        frame_hit_time = time_call(load_products_csv, csv_path)
+
+        # Drop the in-process frames so these loads are served by the sidecar file
+        clear_frame_cache()
+        hit_time = time_call(load_products_csv, csv_path)
+        clear_frame_cache()
+        subset_time = time_call(load_products_csv, csv_path, columns=['category', 'llm_fallback_used'])
+
+        from_csv = load_products_csv(csv_path, use_cache=False)
+        clear_frame_cache()
+        from_cache = load_products_csv(csv_path)
+        identical = from_csv.equals(from_cache)
+        sidecar_mb = os.path.getsize(sidecar_path(csv_path)) / (1024 * 1024)
+
+    print(f"   Sidecar size: {sidecar_mb:.1f} MB")
+    print(f"   CSV parse (no cache):    {parse_time:.2f}s")
+    print(f"   CSV parse + build cache: {miss_time:.2f}s")
+    print(f"   Sidecar hit:             {hit_time * 1000:.0f}ms")
+    print(f"   Sidecar hit (2 columns): {subset_time * 1000:.0f}ms")
+    print(f"   Frame cache hit:         {frame_hit_time * 1000:.0f}ms")
+    print(f"   {'✅' if identical else '❌'} Same frame as CSV parse: {identical}")
+
+    return identical
+
+def benchmark_memory(rows):
+    """Report memory of the loaded frame with default and compact dtypes"""
+    print(f"\n🗜️ MEMORY BENCHMARK ({rows:,} rows)")
+    print("=" * 50)
+
+    df = make_synthetic_catalog(rows)
+    for col in ['energy_kcal_per_100g', 'protein_g_per_100g', 'fat_g_per_100g', 'carbs_g_per_100g']:
+        df[col] = np.round(np.random.default_rng(7).random(rows) * 100, 1)
+        df.loc[df.index % 3 == 0, col] = np.nan
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, 'products.csv')
+        save_products_csv(df, csv_path)
+
+        loaded = load_products_csv(csv_path, use_cache=False)
+        compact_products_frame(loaded, report=True)
+
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark csv_handler on a synthetic catalog')
+    parser.add_argument('--rows', type=int, default=500000,
+                       help='Number of synthetic products (default: 500000)')
+
+    args = parser.parse_args()
+
+    ok = benchmark_save(args.rows)
+    ok = benchmark_load(args.rows) and ok
+    ok = benchmark_memory(args.rows) and ok
+    sys.exit(0 if ok else 1)
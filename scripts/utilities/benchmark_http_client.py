@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark the pooled HTTP session against per-call requests.post
+Runs a local keep-alive stub that answers like Ollama's /api/generate,
+then times sequential and concurrent calls with and without pooling
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Add parent directories to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
+from http_client import create_session
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Minimal /api/generate stub with HTTP/1.1 keep-alive"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # headers and body are separate writes
+    connections = 0
+    connections_lock = threading.Lock()
+    delay = 0.0
+
+    def setup(self):
+        super().setup()
+        with StubOllamaHandler.connections_lock:
+            StubOllamaHandler.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.delay:
+            time.sleep(self.delay)
+        body = json.dumps({'model': 'stub', 'response': 'energy_kcal_per_100g: 450', 'done': True}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_server(delay):
+    """Start the stub on a free local port; returns (server, url)"""
+    StubOllamaHandler.delay = delay
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubOllamaHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+
+def run_calls(post, url, count, workers):
+    """Make `count` POSTs from `workers` threads; returns (per-call latencies, wall time)"""
+    payload = {'model': 'stub', 'prompt': 'Product: Amul Butter 500g', 'stream': False}
+
+    def call(_):
+        start = time.perf_counter()
+        response = post(url, json=payload, timeout=10)
+        response.json()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies = list(pool.map(call, range(count)))
+    return latencies, time.perf_counter() - start
+
+def benchmark(label, post, url, count, workers):
+    """Time one client configuration and report latency, throughput and connections opened"""
+    StubOllamaHandler.connections = 0
+    latencies, elapsed = run_calls(post, url, count, workers)
+    ordered = sorted(latencies)
+    p50 = ordered[len(ordered) // 2] * 1000
+    p95 = ordered[int(len(ordered) * 0.95) - 1] * 1000
+    print(f"   {label:<30} p50 {p50:6.2f}ms  p95 {p95:6.2f}ms  "
+          f"{count / elapsed:7,.0f} req/s  {StubOllamaHandler.connections:5,} connections")
+    return count / elapsed
+
+def benchmark_http(count, workers, delay):
+    """Per-call requests.post vs the pooled session, sequential and concurrent"""
+    print(f"🌐 HTTP CLIENT BENCHMARK ({count:,} requests, stub delay {delay * 1000:.0f}ms)")
+    print("=" * 80)
+
+    server, url = start_stub_server(delay)
+    session = create_session({'http://127.0.0.1': workers})
+    try:
+        for threads in (1, workers):
+            mode = 'sequential' if threads == 1 else f'{threads} threads'
+            legacy = benchmark(f'requests.post ({mode})', requests.post, url, count, threads)
+            pooled = benchmark(f'pooled session ({mode})', session.post, url, count, threads)
+            print(f"   Speedup ({mode}): {pooled / legacy:.1f}x")
+    finally:
+        session.close()
+        server.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark pooled HTTP session vs per-call requests')
+    parser.add_argument('--requests', type=int, default=1000, help='Requests per run (default: 1000)')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent threads (default: 8)')
+    parser.add_argument('--delay', type=float, default=0.0, help='Stub response delay in seconds (default: 0)')
+
+    args = parser.parse_args()
+    benchmark_http(args.requests, args.workers, args.delay)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark LLMNutritionService cache hits under concurrent load
+Compares the legacy connect-per-call lookup against the service's
+pooled WAL connections and its in-memory tier, using the same
+worker count as the API server
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import tempfile
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directories to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'external_services'))
+from llm_nutrition_service import LLMNutritionService
+
+def make_products(count):
+    """Synthetic (product_name, brand, category) keys"""
+    return [(f'Synthetic Product {i} 400 Gm', f'Brand {i % 50}', 'snacks') for i in range(count)]
+
+def populate_cache(service, products):
+    """Fill the cache with one entry per product"""
+    nutrition = {'energy_kcal_per_100g': 450, 'protein_g_per_100g': 7.5, 'fat_g_per_100g': 20}
+    for name, brand, category in products:
+        service.save_to_cache(name, brand, category, nutrition, 0.8, 'benchmark')
+
+def legacy_check_cache(service, product_name, brand, category):
+    """The original lookup: a new connection for every call"""
+    product_hash = service.get_product_hash(product_name, brand, category)
+
+    conn = sqlite3.connect(service.cache_db_path)
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT nutrition_data, confidence_score, created_at FROM nutrition_cache WHERE product_hash = ?",
+        (product_hash,)
+    )
+    result = cursor.fetchone()
+    conn.close()
+
+    if result:
+        return {
+            "nutrition_data": json.loads(result[0]),
+            "confidence_score": result[1],
+            "created_at": result[2],
+            "from_cache": True
+        }
+    return None
+
+def run_lookups(lookup, products, workers, rounds):
+    """Look every product up `rounds` times from `workers` threads; returns latencies and wall time"""
+    def timed(product):
+        start = time.perf_counter()
+        result = lookup(*product)
+        assert result is not None, f"Cache miss for {product[0]}"
+        return time.perf_counter() - start
+
+    work = products * rounds
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies = list(pool.map(timed, work))
+    return latencies, time.perf_counter() - start
+
+def report(label, latencies, elapsed):
+    """Print latency percentiles and throughput"""
+    ordered = sorted(latencies)
+    p50 = statistics.median(ordered) * 1000
+    p95 = ordered[int(len(ordered) * 0.95) - 1] * 1000
+    print(f"   {label:<24} p50 {p50:6.3f}ms  p95 {p95:6.3f}ms  {len(latencies) / elapsed:8,.0f} lookups/s")
+    return len(latencies) / elapsed
+
+def benchmark_cache(entries, workers, rounds):
+    """Time cache hits with per-call connections, pooled connections and the memory tier"""
+    print(f"🗄️ CACHE HIT BENCHMARK ({entries:,} entries, {workers} workers, {rounds} rounds)")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'llm_cache.db')
+        products = make_products(entries)
+
+        # memory_cache_size=0 keeps every lookup on SQLite
+        disk_service = LLMNutritionService(db_path, memory_cache_size=0)
+        populate_cache(disk_service, products)
+        memory_service = LLMNutritionService(db_path, memory_cache_size=entries)
+        run_lookups(memory_service.check_cache, products, workers, 1)  # warm the memory tier
+
+        legacy = report('Connect per call',
+                        *run_lookups(lambda *p: legacy_check_cache(disk_service, *p), products, workers, rounds))
+        pooled = report('Pooled connections',
+                        *run_lookups(disk_service.check_cache, products, workers, rounds))
+        memory = report('Memory tier',
+                        *run_lookups(memory_service.check_cache, products, workers, rounds))
+        memory_stats = memory_service.get_cache_stats()['memory_cache']
+        disk_service.close()
+        memory_service.close()
+
+    print(f"   Speedup (pooled): {pooled / legacy:.1f}x")
+    print(f"   Speedup (memory): {memory / legacy:.1f}x (hit rate {memory_stats['hit_rate']:.0%})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark nutrition cache hits under concurrent load')
+    parser.add_argument('--entries', type=int, default=2000, help='Cached products (default: 2000)')
+    parser.add_argument('--workers', type=int, default=5, help='Concurrent threads (default: 5, as the API server)')
+    parser.add_argument('--rounds', type=int, default=5, help='Lookups per product (default: 5)')
+
+    args = parser.parse_args()
+    benchmark_cache(args.entries, args.workers, args.rounds)
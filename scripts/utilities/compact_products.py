@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Compact Products - Fold the products.csv delta log into a new base file
+Checkpoints append row updates to data/products.csv.delta; this rewrites
+products.csv once with all of them applied and clears the log
+"""
+
+import os
+import sys
+import argparse
+
+# Add parent directories to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
+from csv_handler import compact_catalog, read_deltas, delta_path
+
+def show_status(file_path):
+    """Print how many updates are waiting in the delta log"""
+    deltas = read_deltas(file_path)
+    products = set()
+    for values in deltas.values():
+        products.update(values)
+
+    print(f"📋 Delta log: {delta_path(file_path)}")
+    print(f"   Pending field updates: {sum(len(v) for v in deltas.values()):,}")
+    print(f"   Products affected: {len(products):,}")
+    print(f"   Fields: {', '.join(sorted(deltas)) if deltas else 'none'}")
+    return deltas
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compact the products.csv delta log')
+    parser.add_argument('command', choices=['status', 'compact'], nargs='?', default='compact',
+                       help='status: show pending updates, compact: fold them into the CSV (default)')
+    parser.add_argument('--file', default='data/products.csv',
+                       help='Products CSV path (default: data/products.csv)')
+
+    args = parser.parse_args()
+
+    deltas = show_status(args.file)
+    if args.command == 'compact':
+        if not deltas:
+            print("✅ Nothing to compact")
+        else:
+            count = compact_catalog(args.file)
+            print(f"✅ Compacted into {args.file} ({count:,} products)")
@@ -16,6 +16,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'external_services'))
 
 from csv_handler import load_products_csv, save_products_csv
+from http_client import get_session
 from llm_nutrition_service import LLMNutritionService
 
 
@@ -107,8 +108,6 @@ Answer:"""
 
         # Get LLM response using local Ollama
         try:
-            import requests
-            
             payload = {
                 "model": "llama2:13b",  # Use the local model
                 "prompt": prompt,
@@ -119,7 +118,7 @@ Answer:"""
                 }
             }
             
-            response = requests.post(
+            response = get_session().post(
                 "http://localhost:11434/api/generate",
                 headers={"Content-Type": "application/json"},
                 json=payload,
@@ -4,10 +4,15 @@ Cross-references LLM results with known nutrition databases
 """
 
 import json
-import requests
 import time
+import sys
+import os
 from typing import Dict, Optional, Tuple
 
+# Add parent directories to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
+from http_client import get_session
+
 class NutritionValidator:
     """Validates LLM-generated nutrition data against known sources"""
     
@@ -126,7 +131,7 @@ class NutritionValidator:
             search_query = f"{brand} {product_name}".replace(' ', '+')
             search_url = f"https://world.openfoodfacts.org/cgi/search.pl?search_terms={search_query}&json=1"
             
-            response = requests.get(search_url, timeout=10)
+            response = get_session().get(search_url, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 products = data.get('products', [])
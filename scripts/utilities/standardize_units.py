@@ -4,8 +4,14 @@ Auto-standardize size units in master product file
 
 import csv
 import os
+import sys
 from datetime import datetime
 
+# Add parent directories to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
+from csv_handler import atomic_write, compact_catalog, read_deltas
+from catalog_backup import create_backup
+
 def create_unit_mapping():
     """Create comprehensive unit standardization mapping"""
     
@@ -125,15 +131,19 @@ def standardize_units():
     
     unit_mapping = create_unit_mapping()
     
+    # Fold pending delta updates into the base file first; otherwise a later
+    # compaction would replay them over the standardized units
+    if read_deltas('data/products.csv'):
+        compact_catalog('data/products.csv')
+        print(f"✅ Compacted pending catalog updates before standardizing")
+    
     # Read original file
     with open('data/products.csv', 'r', encoding='utf-8') as f:
         lines = f.readlines()
     
     # Create backup
-    backup_filename = f'data/products_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-    with open(backup_filename, 'w', encoding='utf-8') as f:
-        f.writelines(lines)
-    print(f"✅ Backup created: {backup_filename}")
+    snapshot_id = create_backup('data/products.csv', label='standardize_units')
+    print(f"✅ Backup created: snapshot {snapshot_id}")
     
     header = lines[0].strip().split('||')
     size_unit_idx = header.index('size_unit')
@@ -158,14 +168,14 @@ def standardize_units():
             standardized_line = '||'.join(row) + '\n'
             standardized_lines.append(standardized_line)
     
-    # Write standardized file
-    with open('data/products.csv', 'w', encoding='utf-8') as f:
+    # Write standardized file (atomic replace, so a crash keeps the original)
+    with atomic_write('data/products.csv') as f:
         f.writelines(standardized_lines)
     
     print(f"✅ Standardization complete!")
     print(f"   Changes made: {changes_made} products")
     print(f"   Updated file: data/products.csv")
-    print(f"   Backup saved: {backup_filename}")
+    print(f"   Backup saved: snapshot {snapshot_id} (restore with scripts/core/catalog_backup.py)")
     
     return changes_made
 
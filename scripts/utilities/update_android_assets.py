@@ -9,6 +9,10 @@ import shutil
 import sys
 from datetime import datetime
 
+# Add parent directories to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'core'))
+from csv_handler import compact_catalog, read_deltas
+
 def update_android_assets():
     """Update Android app assets with latest product data"""
     
@@ -38,6 +42,11 @@ def update_android_assets():
             shutil.copy2(android_assets_path, backup_path)
             print(f"💾 Backup created: {backup_path}")
         
+        # The app only reads the base file, so fold in pending delta updates first
+        if read_deltas(source_csv):
+            compact_catalog(source_csv)
+            print(f"🗜️ Compacted pending delta updates into {source_csv}")
+        
         # Copy updated CSV to Android assets
         shutil.copy2(source_csv, android_assets_path)
         print(f"✅ Updated Android assets: {android_assets_path}")